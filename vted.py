@@ -1,15 +1,28 @@
 #!/usr/bin/env python3
-import sys, os, mmap, gi, cairo, time, unicodedata
+import sys, os, mmap, gi, cairo, time, unicodedata, weakref
 from threading import Thread
 from array import array
-import math
+from itertools import accumulate, count, islice
+from operator import add
+import re
 import bisect
+import functools
+from contextlib import contextmanager
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
 gi.require_version("Gdk", "4.0")
 
 from gi.repository import Gtk, Adw, Gdk, GObject, Pango, PangoCairo, GLib, Gio
 
+# Modifier bits as plain ints, tested on every key press and click
+_SHIFT = int(Gdk.ModifierType.SHIFT_MASK)
+_CTRL = int(Gdk.ModifierType.CONTROL_MASK)
+_ALT = int(Gdk.ModifierType.ALT_MASK)
+
+# Navigation keys, which no input method handles outside a composition
+_NAV_KEYVALS = frozenset((Gdk.KEY_Up, Gdk.KEY_Down, Gdk.KEY_Left, Gdk.KEY_Right,
+                          Gdk.KEY_Home, Gdk.KEY_End, Gdk.KEY_Page_Up, Gdk.KEY_Page_Down))
+
 CSS_OVERLAY_SCROLLBAR = """
 /* ========================
    Scrollbars (unchanged)
@@ -219,21 +232,187 @@ CSS_OVERLAY_SCROLLBAR = """
 #   HELPER FUNCTIONS
 # ============================================================
 
+@functools.lru_cache(maxsize=4096)
+def _strong_direction(ch):
+    """0 for a strong LTR character, 1 for strong RTL, 2 for neutral."""
+    t = unicodedata.bidirectional(ch)
+    if t in ("L", "LRE", "LRO"):
+        return 0
+    if t in ("R", "AL", "RLE", "RLO"):
+        return 1
+    return 2
+
+
+# _strong_direction() of every Latin-1 code point, indexed by ord()
+_LATIN1_DIRECTION = bytes(_strong_direction(chr(i)) for i in range(256))
+
+
 def detect_rtl_line(text):
     """Detect if a line is RTL using Unicode bidirectional properties.
     
     Returns True if the first strong directional character is RTL,
     False if LTR, or False if no strong directional characters found.
     """
+    # ASCII holds no strong RTL characters
+    if text.isascii():
+        return False
+    table = _LATIN1_DIRECTION
     for ch in text:
-        t = unicodedata.bidirectional(ch)
-        if t in ("L", "LRE", "LRO"):
-            return False
-        if t in ("R", "AL", "RLE", "RLO"):
-            return True
+        o = ord(ch)
+        d = table[o] if o < 256 else _strong_direction(ch)
+        if d != 2:
+            return d == 1
     return False
 
 
+def byte_to_column(text, index):
+    """Column of the character at UTF-8 byte offset index in text.
+    
+    Pango reports positions as byte offsets. ASCII lines map one to one;
+    others decode the byte prefix, which ends on a character boundary.
+    """
+    if text.isascii():
+        return min(index, len(text))
+    return len(text.encode("utf-8")[:index].decode("utf-8", "ignore"))
+
+
+def column_to_byte(text, col):
+    """UTF-8 byte offset of column col in text (inverse of byte_to_column).
+    
+    ASCII lines map one to one; others encode the column prefix.
+    """
+    if text.isascii():
+        return min(col, len(text))
+    return len(text[:col].encode("utf-8"))
+
+
+# General categories counted as word characters: letters, marks, numbers
+_WORD_CATEGORIES = frozenset({'Lu', 'Ll', 'Lt', 'Lm', 'Lo',
+                              'Mn', 'Mc', 'Me',
+                              'Nd', 'Nl', 'No'})
+
+# 1 for every BMP code point is_word_char() accepts; astral chars fall back
+# to unicodedata
+_WORD_CHAR_BMP = bytearray(unicodedata.category(chr(cp)) in _WORD_CATEGORIES
+                           for cp in range(0x10000))
+_WORD_CHAR_BMP[ord('_')] = 1
+
+
+def is_word_char(ch):
+    """Word characters for Ctrl+Arrow/Ctrl+Delete/double-click: letters,
+    digits, combining marks (e.g. Devanagari vowel signs) and '_'."""
+    cp = ord(ch)
+    if cp < 0x10000:
+        return _WORD_CHAR_BMP[cp] == 1
+    return unicodedata.category(ch) in _WORD_CATEGORIES
+
+
+# Ctrl+Arrow character classes: 'w' word char, 's' whitespace, 'o' other
+_CHAR_CLASSES = str.maketrans({
+    i: 'w' if is_word_char(chr(i)) else 's' if chr(i).isspace() else 'o'
+    for i in range(128)
+})
+
+
+@functools.lru_cache(maxsize=16)
+def char_classes(text):
+    """Return a same-length string tagging each char of text 'w', 's' or 'o'.
+
+    Cached: repeated Ctrl+Arrow presses walk the same line over and over.
+    """
+    if text.isascii():
+        return text.translate(_CHAR_CLASSES)
+    word = is_word_char
+    return ''.join('w' if word(ch) else 's' if ch.isspace() else 'o'
+                   for ch in text)
+
+
+# Matches a run of one class at a given position; the scans below only touch
+# the run they skip, so stepping through a huge minified line stays cheap
+_CLASS_RUN = {cls: re.compile(cls + '*') for cls in 'wso'}
+
+
+@functools.lru_cache(maxsize=16)
+def _reversed_classes(tags):
+    return tags[::-1]
+
+
+def skip_class_left(tags, i, cls):
+    """Step i left over the run of `cls` tags that ends just before it"""
+    n = len(tags)
+    i = min(i, n)
+    if i <= 0:
+        return 0
+    return n - _CLASS_RUN[cls].match(_reversed_classes(tags), n - i).end()
+
+
+def skip_class_right(tags, i, cls):
+    """Step i right over the run of `cls` tags that starts at it"""
+    return _CLASS_RUN[cls].match(tags, i).end()
+
+
+# word_left/word_right are pure functions of (line text, col), so results can
+# be cached by value: an edited line is a different key, nothing to invalidate
+@functools.lru_cache(maxsize=256)
+def word_left(line, col):
+    """Column Ctrl+Left lands on from col: the start of the previous word"""
+    tags = char_classes(line)
+    
+    # Skip whitespace to the left
+    col = skip_class_left(tags, col, 's')
+    if col == 0:
+        return col
+    
+    # Now we're on a non-whitespace character: skip the run of word
+    # characters, or of symbols/punctuation (treated as a "word")
+    return skip_class_left(tags, col, tags[col - 1])
+
+
+@functools.lru_cache(maxsize=256)
+def word_right(line, col):
+    """Column just past the next word from col (whitespace, then one run)"""
+    tags = char_classes(line)
+    col = skip_class_right(tags, col, 's')
+    if col >= len(tags):
+        return col
+    return skip_class_right(tags, col, tags[col])
+
+
+def batched_changes(method):
+    """Run a VirtualBuffer method inside buf.batched() so nested edits emit once"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.batched():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+# Word chars map to 'W', separators (space, '_', punctuation) to 'S'
+_WORD_MARKS = str.maketrans({i: 'W' if chr(i).isalnum() else 'S' for i in range(128)})
+
+
+def word_marks(text):
+    """Return a same-length string marking each char as word ('W') or separator ('S')"""
+    if text.isascii():
+        return text.translate(_WORD_MARKS)
+    return ''.join('W' if ch.isalnum() else 'S' for ch in text)
+
+
+def skip_marks_left(marks, i, kind):
+    """Step i left over the run of `kind` marks that ends just before it"""
+    if i <= 0 or i > len(marks):
+        return i
+    return marks.rfind('S' if kind == 'W' else 'W', 0, i) + 1
+
+
+def skip_marks_right(marks, i, kind):
+    """Step i right over the run of `kind` marks that starts at it"""
+    if i < 0 or i >= len(marks):
+        return i
+    j = marks.find('S' if kind == 'W' else 'W', i)
+    return len(marks) if j < 0 else j
+
+
 # ============================================================
 #   FULL INDEXING BUT MEMORY-SAFE
 # ============================================================
@@ -245,6 +424,11 @@ class IndexedFile:
     Works for UTF-8 and UTF-16 (LE/BE).
     """
 
+    __slots__ = ('path', 'encoding', 'raw', 'mm', 'index', '_lines')
+
+    # Most decoded lines kept by __getitem__
+    LINE_CACHE_SIZE = 512
+
     def __init__(self, path):
         print(f"Opening file: {path}")
         start = time.time()
@@ -260,6 +444,10 @@ class IndexedFile:
         # 'Q' = unsigned long long (8 bytes, perfect for file offsets)
         self.index = array('Q')
 
+        # Decoded lines by line number, oldest first. The mapping is
+        # read-only, so entries never go stale.
+        self._lines = {}
+
     def detect_encoding(self, path):
         with open(path, "rb") as f:
             data = f.read(4096)  # small peek is enough
@@ -295,10 +483,15 @@ class IndexedFile:
         
         print(f"Indexing {len(self.mm) / (1024**3):.2f}GB file ({enc})...")
 
+        # Indexing reads the file front to back; afterwards lines are read
+        # a few at a time wherever the view is, so readahead only wastes I/O
+        self._lines.clear()
+        self._advise("MADV_SEQUENTIAL")
         if enc.startswith("utf-16"):
             self._index_utf16(progress_callback)
         else:
             self._index_utf8(progress_callback)
+        self._advise("MADV_RANDOM")
         
         elapsed = time.time() - start_time
         index_size_mb = len(self.index) * 8 / (1024**2)  # 8 bytes per entry
@@ -307,36 +500,40 @@ class IndexedFile:
         print(f"Average line length: {len(self.mm)/(len(self.index)-1):.0f} bytes")
         print(f"Index memory: {index_size_mb:.1f} MB ({index_size_mb*100/len(self.mm)*1024:.2f}% of file size)")
 
+    def _advise(self, name):
+        """Pass the mmap.MADV_* hint name to the kernel where supported."""
+        advice = getattr(mmap, name, None)
+        if advice is not None:
+            try:
+                self.mm.madvise(advice)
+            except OSError:
+                pass
+
     def _index_utf8(self, progress_callback=None):
-        """Fast UTF-8 indexing using mmap.find() - optimized for huge files"""
+        """Fast UTF-8 indexing over 1MB slabs of the mmap - optimized for huge files"""
         mm = self.mm
         total_size = len(mm)
         
         # Use array.array for fast integer storage (10-20x faster than list for millions of items)
         self.index = array('Q', [0])
         
-        # Use mmap.find() to scan for newlines
-        pos = 0
+        slab_size = 1 << 20
         last_report = 0
         report_interval = 50_000_000  # Report every 50MB for less overhead
         
-        while pos < total_size:
+        for slab_start in range(0, total_size, slab_size):
             # Report progress less frequently (every 50MB instead of 10MB)
-            if progress_callback and pos - last_report > report_interval:
-                last_report = pos
-                progress = pos / total_size
+            if progress_callback and slab_start - last_report > report_interval:
+                last_report = slab_start
+                progress = slab_start / total_size
                 GLib.idle_add(progress_callback, progress)
             
-            # Find next newline directly in mmap (fast C-level search)
-            newline_pos = mm.find(b'\n', pos)
-            
-            if newline_pos == -1:
-                # No more newlines
-                break
-            
-            # Record position after the newline
-            pos = newline_pos + 1
-            self.index.append(pos)
+            # Every piece but the last ends at a newline; the offset after
+            # piece i is slab_start + (lengths up to i) + (i + 1) newlines.
+            # split/map/accumulate all run in C, with no Python per line
+            pieces = mm[slab_start:slab_start + slab_size].split(b'\n')
+            del pieces[-1]
+            self.index.extend(map(add, accumulate(map(len, pieces)), count(slab_start + 1)))
         
         # Ensure file end is recorded
         if not self.index or self.index[-1] != total_size:
@@ -346,7 +543,7 @@ class IndexedFile:
             GLib.idle_add(progress_callback, 1.0)
 
     def _index_utf16(self, progress_callback=None):
-        """Fast UTF-16 indexing using mmap.find() directly - no memory copies"""
+        """Fast UTF-16 indexing over 1MB slabs of the mmap, like _index_utf8"""
         mm = self.mm
         total_size = len(mm)
         
@@ -364,30 +561,45 @@ class IndexedFile:
                 start_pos = 2
         
         # Use array.array for fast integer storage
-        self.index = array('Q', [start_pos])
+        index = self.index = array('Q', [start_pos])
         
-        # Use mmap.find() to scan for newlines
-        pos = start_pos
+        # Slabs have an even size, so code units never straddle two of them
+        slab_size = 1 << 20
         last_report = 0
         report_interval = 50_000_000  # Report every 50MB for less overhead
         
-        while pos < total_size:
+        for slab_start in range(start_pos, total_size, slab_size):
             # Report progress less frequently
-            if progress_callback and pos - last_report > report_interval:
-                last_report = pos
-                progress = pos / total_size
+            if progress_callback and slab_start - last_report > report_interval:
+                last_report = slab_start
+                progress = slab_start / total_size
                 GLib.idle_add(progress_callback, progress)
             
-            # Find next newline directly in mmap (no copy!)
-            newline_pos = mm.find(newline_bytes, pos)
+            slab_end = min(slab_start + slab_size, total_size)
+            pieces = mm[slab_start:slab_end].split(newline_bytes)
+            del pieces[-1]
+            lengths = list(map(len, pieces))
             
-            if newline_pos == -1:
-                # No more newlines
-                break
+            if not any(map((1).__and__, lengths)):
+                # All matches on code unit boundaries: the offset after
+                # newline i is slab_start + (lengths up to i) + 2 * (i + 1)
+                index.extend(map(add, accumulate(lengths), count(slab_start + 2, 2)))
+                continue
             
-            # Record position after the newline (skip the 2-byte newline)
-            pos = newline_pos + 2
-            self.index.append(pos)
+            # An odd-length piece means a match straddled two code units
+            # (e.g. U+0A0A then U+0000 in UTF-16LE); rescan this slab
+            # keeping only aligned newlines
+            pos = slab_start
+            while True:
+                newline_pos = mm.find(newline_bytes, pos, slab_end)
+                if newline_pos == -1:
+                    break
+                if (newline_pos - start_pos) & 1:
+                    pos = newline_pos + 1
+                    continue
+                # Record position after the newline (skip the 2-byte newline)
+                pos = newline_pos + 2
+                index.append(pos)
         
         # Ensure file end is recorded
         if not self.index or self.index[-1] != total_size:
@@ -400,6 +612,11 @@ class IndexedFile:
         return len(self.index) - 1
 
     def __getitem__(self, line):
+        # Redraws read the same visible lines frame after frame
+        text = self._lines.get(line)
+        if text is not None:
+            return text
+
         if line < 0 or line >= self.total_lines():
             return ""
 
@@ -407,7 +624,12 @@ class IndexedFile:
         end = self.index[line + 1]
 
         raw = self.mm[start:end]
-        return raw.decode(self.encoding, errors="replace").rstrip("\n\r")
+        text = raw.decode(self.encoding, errors="replace").rstrip("\n\r")
+        lines = self._lines
+        if len(lines) >= self.LINE_CACHE_SIZE:
+            del lines[next(iter(lines))]
+        lines[line] = text
+        return text
 
 
 # ============================================================
@@ -416,6 +638,9 @@ class IndexedFile:
 
 class Selection:
     """Manages text selection state"""
+
+    __slots__ = ('start_line', 'start_col', 'end_line', 'end_col',
+                 'active', 'selecting_with_keyboard')
     
     def __init__(self):
         self.start_line = -1
@@ -448,6 +673,14 @@ class Selection:
         self.end_col = col
         self.active = (self.start_line != self.end_line or self.start_col != self.end_col)
     
+    def set_range(self, start_line, start_col, end_line, end_col):
+        """Set both selection points at once (set_start + set_end in one call)"""
+        self.start_line = start_line
+        self.start_col = start_col
+        self.end_line = end_line
+        self.end_col = end_col
+        self.active = (start_line != end_line or start_col != end_col)
+    
     def has_selection(self):
         """Check if there's an active selection"""
         return self.active and (
@@ -472,24 +705,21 @@ class Selection:
             else:
                 return self.end_line, self.end_col, self.start_line, self.start_col
     
-    def contains_position(self, line, col):
-        """Check if a position is within the selection"""
+    def contains_position(self, line, col, include_end=True):
+        """Check if a position is within the selection.
+        
+        include_end=False leaves out the end position itself, which is how
+        clicks are tested (clicking just after the selection is outside it).
+        """
         if not self.has_selection():
             return False
             
         start_line, start_col, end_line, end_col = self.get_bounds()
         
-        if line < start_line or line > end_line:
-            return False
-        
-        if line == start_line and line == end_line:
-            return start_col <= col <= end_col
-        elif line == start_line:
-            return col >= start_col
-        elif line == end_line:
-            return col <= end_col
-        else:
-            return True
+        # (line, col) pairs order like positions in the text
+        if include_end:
+            return (start_line, start_col) <= (line, col) <= (end_line, end_col)
+        return (start_line, start_col) <= (line, col) < (end_line, end_col)
 
 
 # ============================================================
@@ -504,10 +734,12 @@ class VirtualBuffer(GObject.Object):
     def __init__(self):
         super().__init__()
         self.file = None            # IndexedFile
-        self.edits = {}             # sparse: logical_line → modified string
-        self.deleted_lines = set()  # Track deleted logical lines
-        self.inserted_lines = {}    # Track inserted lines: logical_line → content
+        self._file_total = 0        # file.total_lines(), fixed once the file is indexed
+        self.overlay = {}           # sparse: logical_line → edited or inserted line text
         self.line_offsets = []      # List of (logical_line, offset) tuples - sorted by logical_line
+        self._offset_keys = None    # logical_line column of line_offsets, rebuilt lazily
+        self._l2p_idx = None        # line_offsets segment hit by the last lookup
+        self._len_cache = {}        # physical file line → length, for line_len()
         self.cursor_line = 0
         self.cursor_col = 0
         self.selection = Selection()
@@ -516,43 +748,98 @@ class VirtualBuffer(GObject.Object):
         self.last_move_was_partial = False
         self.expected_selection = None
 
+        # "changed" coalescing for compound edits (see batched())
+        self._emit_depth = 0
+        self._emit_pending = False
+
     def load(self, indexed_file):
         self.file = indexed_file
-        self.edits.clear()
-        self.deleted_lines.clear()
-        self.inserted_lines.clear()
+        self._file_total = indexed_file.total_lines()
+        self.overlay.clear()
         self.line_offsets = []
+        self._offset_keys = None
+        self._l2p_idx = None
+        self._len_cache.clear()
         self.cursor_line = 0
         self.cursor_col = 0
         self.selection.clear()
-        self.emit("changed")
+        self._mark_changed()
+
+
+    def line_len(self, ln):
+        """Return the length of logical line ln.
+
+        Edited and inserted lines are measured directly; untouched file lines
+        are cached by physical line number, which never changes for a loaded
+        file, so cursor clamping does not keep re-decoding them.
+        """
+        text = self.overlay.get(ln)
+        if text is not None:
+            return len(text)
+        if not self.file:
+            return 0
+
+        physical = self._logical_to_physical(ln)
+        n = self._len_cache.get(physical)
+        if n is None:
+            n = len(self.file[physical]) if 0 <= physical < self._file_total else 0
+            self._len_cache[physical] = n
+        return n
+
+    def _mark_changed(self):
+        """Emit "changed" now, or once at the end of the enclosing batch"""
+        if self._emit_depth:
+            self._emit_pending = True
+        else:
+            self.emit("changed")
 
+    @contextmanager
+    def batched(self):
+        """Coalesce every "changed" emission inside the block into one"""
+        self._emit_depth += 1
+        try:
+            yield
+        finally:
+            self._emit_depth -= 1
+            if self._emit_depth == 0 and self._emit_pending:
+                self._emit_pending = False
+                self.emit("changed")
 
     def _logical_to_physical(self, logical_line):
-        """Convert logical line number to physical file line number"""
+        """Convert logical line number to physical file line number.
+
+        Rendering asks for consecutive lines, which nearly always fall in
+        the same offset segment as the previous lookup, so that segment is
+        remembered and the bisect is skipped while it still applies.
+        """
         if not self.file:
             return logical_line
-        
-        # Calculate cumulative offset at this logical line
-        offset = 0
-        for log_line, off in self.line_offsets:
-            if log_line <= logical_line:
-                offset = off
-            else:
-                break
-        
+
+        if not self.line_offsets:
+            return logical_line
+
+        keys = self._offset_keys
+        if keys is None:
+            keys = self._offset_keys = [lo for lo, _ in self.line_offsets]
+
+        idx = self._l2p_idx
+        if (idx is None or keys[idx] > logical_line
+                or (idx + 1 < len(keys) and keys[idx + 1] <= logical_line)):
+            idx = bisect.bisect_right(keys, logical_line) - 1
+            if idx < 0:
+                return logical_line
+            self._l2p_idx = idx
+
+        _, offset = self.line_offsets[idx]
         return logical_line - offset
 
     def total(self):
         """Return total number of logical lines in the buffer."""
         if not self.file:
-            if not self.edits and not self.inserted_lines:
-                return 1
-            all_lines = set(self.edits.keys()) | set(self.inserted_lines.keys())
-            return max(1, max(all_lines) + 1) if all_lines else 1
+            return max(self.overlay) + 1 if self.overlay else 1
 
         # File is present - file lines plus net insertions
-        base = self.file.total_lines()
+        base = self._file_total
         
         # Calculate net change from offsets
         if self.line_offsets:
@@ -562,63 +849,91 @@ class VirtualBuffer(GObject.Object):
         
         return base
 
+    @property
+    def last_line_index(self):
+        """Logical number of the last line (total() - 1)"""
+        return self.total() - 1
+
     def get_line(self, ln):
-        # Check if it's an inserted line first
-        if ln in self.inserted_lines:
-            return self.inserted_lines[ln]
-        
-        # Check if it's an edited line
-        if ln in self.edits:
-            return self.edits[ln]
-        
-        # Check if deleted
-        if ln in self.deleted_lines:
-            return ""
+        # Edited and inserted lines live in the overlay
+        text = self.overlay.get(ln)
+        if text is not None:
+            return text
         
         # Convert to physical line and return from file
         if self.file:
             physical = self._logical_to_physical(ln)
-            return self.file[physical] if 0 <= physical < self.file.total_lines() else ""
+            return self.file[physical] if 0 <= physical < self._file_total else ""
         return ""
 
+    def _shift_lines_above(self, threshold, delta):
+        """Renumber every virtual line keyed above threshold by delta, in place.
+
+        Only the affected tail is touched; keys are visited away from the
+        direction of the shift so a moved entry never lands on one that
+        still has to move.
+        """
+        overlay = self.overlay
+        for k in sorted((k for k in overlay if k > threshold), reverse=delta > 0):
+            overlay[k + delta] = overlay.pop(k)
+
+    def _drop_lines(self, first, last):
+        """Forget virtual lines first..last and close the gap they leave.
+
+        Shared by every edit that removes whole lines (line merges,
+        multi-line selection delete, Ctrl+D). The overlay is walked once:
+        keys inside the range are popped, keys past it are popped and
+        re-inserted lower. Ascending order keeps a moved entry from landing
+        on one that still has to move.
+        """
+        delta = first - last - 1
+        overlay = self.overlay
+        for k in sorted(k for k in overlay if k >= first):
+            text = overlay.pop(k)
+            if k > last:
+                overlay[k + delta] = text
+
     def _add_offset(self, at_line, delta):
         """Add an offset delta starting at logical line at_line"""
-        # Find if there's already an offset entry at this line
-        found_idx = -1
-        for idx, (log_line, offset) in enumerate(self.line_offsets):
-            if log_line == at_line:
-                found_idx = idx
-                break
-        
-        if found_idx >= 0:
-            # Update existing offset
-            old_offset = self.line_offsets[found_idx][1]
-            self.line_offsets[found_idx] = (at_line, old_offset + delta)
-        else:
-            # Add new offset entry
-            # First, find what the offset was just before this line
-            prev_offset = 0
-            insert_idx = 0
-            for idx, (log_line, offset) in enumerate(self.line_offsets):
-                if log_line < at_line:
-                    prev_offset = offset
-                    insert_idx = idx + 1
-                else:
-                    break
-            
-            # Insert new offset entry
-            self.line_offsets.insert(insert_idx, (at_line, prev_offset + delta))
-        
-        # Update all subsequent offset entries
-        for idx in range(found_idx + 1 if found_idx >= 0 else insert_idx + 1, len(self.line_offsets)):
-            log_line, offset = self.line_offsets[idx]
-            self.line_offsets[idx] = (log_line, offset + delta)
+        self._offset_keys = None
+        self._l2p_idx = None
+
+        # Fast path: empty offsets
+        if not self.line_offsets:
+            self.line_offsets.append((at_line, delta))
+            return
+
+        keys = [lo for lo, _ in self.line_offsets]
+        pos = bisect.bisect_left(keys, at_line)
+
+        # Case 1: exact match → update
+        if pos < len(self.line_offsets) and self.line_offsets[pos][0] == at_line:
+            old = self.line_offsets[pos][1]
+            new_val = old + delta
+            self.line_offsets[pos] = (at_line, new_val)
+
+            # Update following offsets
+            for i in range(pos + 1, len(self.line_offsets)):
+                lo, off = self.line_offsets[i]
+                self.line_offsets[i] = (lo, off + delta)
+
+            return
+
+        # Case 2: insert new offset
+        # Find previous offset value
+        prev_offset = self.line_offsets[pos-1][1] if pos > 0 else 0
+
+        self.line_offsets.insert(pos, (at_line, prev_offset + delta))
+
+        # Update subsequent offsets
+        for i in range(pos + 1, len(self.line_offsets)):
+            lo, off = self.line_offsets[i]
+            self.line_offsets[i] = (lo, off + delta)
 
     def set_cursor(self, ln, col, extend_selection=False):
         total = self.total()
         ln = max(0, min(ln, total - 1))
-        line = self.get_line(ln)
-        col = max(0, min(col, len(line)))
+        col = max(0, min(col, self.line_len(ln)))
         
         if extend_selection:
             # Start selection if not already active
@@ -634,16 +949,49 @@ class VirtualBuffer(GObject.Object):
         self.cursor_line = ln
         self.cursor_col = col
 
+    def begin_drag_at(self, ln, col):
+        """Place the cursor at (ln, col) with an empty selection anchored there.
+
+        Replaces set_cursor(ln, col) followed by an empty
+        selection.set_range(ln, col, ln, col) when a mouse drag starts.
+        """
+        self.selection.set_range(ln, col, ln, col)
+        ln = max(0, min(ln, self.total() - 1))
+        self.cursor_line = ln
+        self.cursor_col = max(0, min(col, self.line_len(ln)))
+
+    def extend_selection_to(self, ln, col):
+        """Drag the selection end and the cursor to (ln, col) in one step.
+
+        Same result as selection.set_end(ln, col) followed by
+        set_cursor(ln, col, extend_selection=True), which mouse drags and
+        shift-clicks used to do separately.
+        """
+        sel = self.selection
+        anchor_hit = sel.start_line == ln and sel.start_col == col
+        
+        ln = max(0, min(ln, self.total() - 1))
+        col = max(0, min(col, self.line_len(ln)))
+        
+        if anchor_hit:
+            # Dragged back onto the anchor: re-anchor at the cursor
+            sel.set_range(self.cursor_line, self.cursor_col, ln, col)
+        else:
+            sel.set_end(ln, col)
+        
+        self.cursor_line = ln
+        self.cursor_col = col
+
     def select_all(self):
         """Select all text in the buffer"""
         self.selection.set_start(0, 0)
         total = self.total()
         last_line = total - 1
-        last_line_text = self.get_line(last_line)
-        self.selection.set_end(last_line, len(last_line_text))
+        last_len = self.line_len(last_line)
+        self.selection.set_end(last_line, last_len)
         self.cursor_line = last_line
-        self.cursor_col = len(last_line_text)
-        self.emit("changed")
+        self.cursor_col = last_len
+        self._mark_changed()
     
     def get_selected_text(self):
         """Get the currently selected text"""
@@ -656,17 +1004,13 @@ class VirtualBuffer(GObject.Object):
             line = self.get_line(start_line)
             return line[start_col:end_col]
         else:
-            lines = []
-            first_line = self.get_line(start_line)
-            lines.append(first_line[start_col:])
-            
-            for ln in range(start_line + 1, end_line):
-                lines.append(self.get_line(ln))
-            
-            last_line = self.get_line(end_line)
-            lines.append(last_line[:end_col])
-            
-            return '\n'.join(lines)
+            # Fetch every line in one comprehension, then trim the two ends
+            get_line = self.get_line
+            parts = [get_line(ln) for ln in range(start_line, end_line + 1)]
+            parts[0] = parts[0][start_col:]
+            parts[-1] = parts[-1][:end_col]
+
+            return '\n'.join(parts)
     
     def delete_selection(self):
         """Delete the selected text"""
@@ -680,10 +1024,7 @@ class VirtualBuffer(GObject.Object):
             line = self.get_line(start_line)
             new_line = line[:start_col] + line[end_col:]
             
-            if start_line in self.inserted_lines:
-                self.inserted_lines[start_line] = new_line
-            else:
-                self.edits[start_line] = new_line
+            self.overlay[start_line] = new_line
         else:
             # Multi-line selection
             first_line = self.get_line(start_line)
@@ -693,55 +1034,11 @@ class VirtualBuffer(GObject.Object):
             # Calculate number of lines being deleted
             lines_deleted = end_line - start_line
             
-            # Shift down all virtual lines above the deleted range
-            new_ins = {}
-            for k, v in self.inserted_lines.items():
-                if k < start_line:
-                    new_ins[k] = v
-                elif k == start_line:
-                    # This will be set below
-                    pass
-                elif k <= end_line:
-                    # Skip deleted lines
-                    pass
-                else:
-                    # Shift down
-                    new_ins[k - lines_deleted] = v
-            
-            new_ed = {}
-            for k, v in self.edits.items():
-                if k < start_line:
-                    new_ed[k] = v
-                elif k == start_line:
-                    # This will be set below
-                    pass
-                elif k <= end_line:
-                    # Skip deleted lines
-                    pass
-                else:
-                    # Shift down
-                    new_ed[k - lines_deleted] = v
-            
-            new_del = set()
-            for k in self.deleted_lines:
-                if k < start_line:
-                    new_del.add(k)
-                elif k <= end_line:
-                    # Skip deleted lines
-                    pass
-                else:
-                    # Shift down
-                    new_del.add(k - lines_deleted)
-            
+            # Drop the merged-away lines and pull later virtual lines up
+            self._drop_lines(start_line + 1, end_line)
+
             # Set the merged line
-            if start_line in self.inserted_lines:
-                new_ins[start_line] = new_line
-            else:
-                new_ed[start_line] = new_line
-            
-            self.inserted_lines = new_ins
-            self.edits = new_ed
-            self.deleted_lines = new_del
+            self.overlay[start_line] = new_line
             
             # Update line offsets
             self._add_offset(start_line + 1, -lines_deleted)
@@ -749,10 +1046,40 @@ class VirtualBuffer(GObject.Object):
         self.cursor_line = start_line
         self.cursor_col = start_col
         self.selection.clear()
-        self.emit("changed")
+        self._mark_changed()
         return True
 
+    @batched_changes
+    def move_selection_to(self, ln, col, text):
+        """Move the selection, whose text is text, to (ln, col) (drag-and-drop).
+        
+        (ln, col) is given in the layout before the move and is shifted to
+        account for the deleted text. Emits "changed" once.
+        """
+        start_line, start_col, end_line, end_col = self.selection.get_bounds()
+        
+        # Delete first
+        self.delete_selection()
+        # Recalculate drop position if it's after the deleted text
+        if ln > end_line or (ln == end_line and col > end_col):
+            # Adjust for deleted text
+            if start_line == end_line:
+                # Single line deletion
+                chars_deleted = end_col - start_col
+                if ln == start_line:
+                    col -= chars_deleted
+            else:
+                # Multi-line deletion
+                lines_deleted = end_line - start_line
+                if ln > end_line:
+                    ln -= lines_deleted
+        
+        # Insert at adjusted position
+        self.set_cursor(ln, col)
+        self.insert_text(text)
+
 
+    @batched_changes
     def insert_text(self, text):
         # If there's a selection, delete it first
         if self.selection.has_selection():
@@ -762,30 +1089,24 @@ class VirtualBuffer(GObject.Object):
         col = self.cursor_col
         old = self.get_line(ln)
 
-        # Split insert by newline
-        parts = text.split("\n")
-
-        if len(parts) == 1:
+        if "\n" not in text:
             # ---------------------------
             # Simple one-line insert
             # ---------------------------
             new_line = old[:col] + text + old[col:]
 
-            if ln in self.inserted_lines:
-                self.inserted_lines[ln] = new_line
-            else:
-                self.edits[ln] = new_line
+            self.overlay[ln] = new_line
 
             self.cursor_col += len(text)
-            self.emit("changed")
+            self._mark_changed()
             return
 
         # ------------------------------------------------------------
         # Multi-line insert
         # ------------------------------------------------------------
+        parts = text.split("\n")
         first = parts[0]
         last  = parts[-1]
-        middle = parts[1:-1]   # may be empty
 
         # Left + first-line fragment
         left_part  = old[:col] + first
@@ -795,55 +1116,22 @@ class VirtualBuffer(GObject.Object):
         lines_to_insert = len(parts) - 1
 
         # Shift up all virtual lines after current line
-        new_ins = {}
-        for k, v in self.inserted_lines.items():
-            if k < ln:
-                new_ins[k] = v
-            elif k == ln:
-                # This will be set below
-                pass
-            else:
-                # Shift up
-                new_ins[k + lines_to_insert] = v
-
-        new_ed = {}
-        for k, v in self.edits.items():
-            if k < ln:
-                new_ed[k] = v
-            elif k == ln:
-                # This will be set below
-                pass
-            else:
-                # Shift up
-                new_ed[k + lines_to_insert] = v
-
-        new_del = set()
-        for k in self.deleted_lines:
-            if k < ln:
-                new_del.add(k)
-            else:
-                new_del.add(k + lines_to_insert)
+        self._shift_lines_above(ln, lines_to_insert)
 
         # Set the new lines
-        if ln in self.inserted_lines:
-            new_ins[ln] = left_part
-        else:
-            new_ed[ln] = left_part
+        self.overlay[ln] = left_part
             
-        for i, m in enumerate(middle):
-            new_ins[ln + 1 + i] = m
+        # Middle lines are read in place rather than copied out as parts[1:-1]
+        for i in range(1, lines_to_insert):
+            self.overlay[ln + i] = parts[i]
             
-        new_ins[ln + lines_to_insert] = right_part
-        
-        self.inserted_lines = new_ins
-        self.edits = new_ed
-        self.deleted_lines = new_del
+        self.overlay[ln + lines_to_insert] = right_part
         
         self._add_offset(ln + 1, lines_to_insert)
         
         self.cursor_line = ln + lines_to_insert
         self.cursor_col = len(right_part) - len(old[col:])
-        self.emit("changed")
+        self._mark_changed()
 
     def indent_selection(self):
         """Indent selected lines or current line"""
@@ -859,10 +1147,7 @@ class VirtualBuffer(GObject.Object):
             line = self.get_line(ln)
             new_line = "    " + line
             
-            if ln in self.inserted_lines:
-                self.inserted_lines[ln] = new_line
-            else:
-                self.edits[ln] = new_line
+            self.overlay[ln] = new_line
         
         # Adjust selection and cursor
         # If selection started at 0, keep it at 0 to include the new indentation
@@ -871,7 +1156,7 @@ class VirtualBuffer(GObject.Object):
             
         self.selection.end_col += 4
         self.cursor_col += 4
-        self.emit("changed")
+        self._mark_changed()
 
     def unindent_selection(self):
         """Unindent selected lines or current line"""
@@ -895,13 +1180,10 @@ class VirtualBuffer(GObject.Object):
             else:
                 return # Nothing to unindent
             
-            if ln in self.inserted_lines:
-                self.inserted_lines[ln] = new_line
-            else:
-                self.edits[ln] = new_line
+            self.overlay[ln] = new_line
             
             self.cursor_col = max(0, self.cursor_col - removed)
-            self.emit("changed")
+            self._mark_changed()
             return
 
         start_line, start_col, end_line, end_col = self.selection.get_bounds()
@@ -929,10 +1211,7 @@ class VirtualBuffer(GObject.Object):
                 new_line = line
             
             if removed > 0:
-                if ln in self.inserted_lines:
-                    self.inserted_lines[ln] = new_line
-                else:
-                    self.edits[ln] = new_line
+                self.overlay[ln] = new_line
             
             if ln == start_line:
                 removed_start = removed
@@ -944,7 +1223,7 @@ class VirtualBuffer(GObject.Object):
         # But we should try to keep it valid.
         self.selection.start_col = max(0, self.selection.start_col - removed_start)
         self.selection.end_col = max(0, self.selection.end_col - removed_end)
-        self.emit("changed")
+        self._mark_changed()
 
 
 
@@ -964,48 +1243,10 @@ class VirtualBuffer(GObject.Object):
                 new_line = prev_line + line
                 
                 # Update previous line with merged content
-                if ln - 1 in self.inserted_lines:
-                    self.inserted_lines[ln - 1] = new_line
-                else:
-                    self.edits[ln - 1] = new_line
+                self.overlay[ln - 1] = new_line
                 
-                # Shift down all virtual lines after current line
-                new_ins = {}
-                for k, v in self.inserted_lines.items():
-                    if k < ln:
-                        new_ins[k] = v
-                    elif k == ln:
-                        # Skip - this line is being deleted
-                        pass
-                    else:
-                        # Shift down by 1
-                        new_ins[k - 1] = v
-                
-                new_ed = {}
-                for k, v in self.edits.items():
-                    if k < ln:
-                        new_ed[k] = v
-                    elif k == ln:
-                        # Skip - this line is being deleted
-                        pass
-                    else:
-                        # Shift down by 1
-                        new_ed[k - 1] = v
-                
-                new_del = set()
-                for k in self.deleted_lines:
-                    if k < ln:
-                        new_del.add(k)
-                    elif k == ln:
-                        # Skip - already being deleted
-                        pass
-                    else:
-                        # Shift down by 1
-                        new_del.add(k - 1)
-                
-                self.inserted_lines = new_ins
-                self.edits = new_ed
-                self.deleted_lines = new_del
+                # Drop this line and pull later virtual lines up
+                self._drop_lines(ln, ln)
                 
                 # Track offset change (1 line deleted)
                 self._add_offset(ln + 1, -1)
@@ -1016,15 +1257,12 @@ class VirtualBuffer(GObject.Object):
             # Normal backspace within a line
             new_line = line[:col-1] + line[col:]
             
-            if ln in self.inserted_lines:
-                self.inserted_lines[ln] = new_line
-            else:
-                self.edits[ln] = new_line
+            self.overlay[ln] = new_line
             
             self.cursor_col = col - 1
 
         self.selection.clear()
-        self.emit("changed")
+        self._mark_changed()
         
 
 
@@ -1045,48 +1283,10 @@ class VirtualBuffer(GObject.Object):
                 new_line = line + next_line
                 
                 # Update current line with merged content
-                if ln in self.inserted_lines:
-                    self.inserted_lines[ln] = new_line
-                else:
-                    self.edits[ln] = new_line
-                
-                # Shift down all virtual lines after next line
-                new_ins = {}
-                for k, v in self.inserted_lines.items():
-                    if k <= ln:
-                        new_ins[k] = v
-                    elif k == ln + 1:
-                        # Skip - this line is being deleted
-                        pass
-                    else:
-                        # Shift down by 1
-                        new_ins[k - 1] = v
-                
-                new_ed = {}
-                for k, v in self.edits.items():
-                    if k <= ln:
-                        new_ed[k] = v
-                    elif k == ln + 1:
-                        # Skip - this line is being deleted
-                        pass
-                    else:
-                        # Shift down by 1
-                        new_ed[k - 1] = v
-                
-                new_del = set()
-                for k in self.deleted_lines:
-                    if k <= ln:
-                        new_del.add(k)
-                    elif k == ln + 1:
-                        # Skip - already being deleted
-                        pass
-                    else:
-                        # Shift down by 1
-                        new_del.add(k - 1)
+                self.overlay[ln] = new_line
                 
-                self.inserted_lines = new_ins
-                self.edits = new_ed
-                self.deleted_lines = new_del
+                # Drop the merged next line and pull later virtual lines up
+                self._drop_lines(ln + 1, ln + 1)
                 
                 # Track offset change (1 line deleted)
                 self._add_offset(ln + 2, -1)
@@ -1094,23 +1294,13 @@ class VirtualBuffer(GObject.Object):
             # Normal delete within a line
             new_line = line[:col] + line[col+1:]
             
-            if ln in self.inserted_lines:
-                self.inserted_lines[ln] = new_line
-            else:
-                self.edits[ln] = new_line
+            self.overlay[ln] = new_line
         
         self.selection.clear()
-        self.emit("changed")
+        self._mark_changed()
     
     def delete_word_forward(self):
         """Delete from cursor to end of current word (Ctrl+Delete)"""
-        import unicodedata
-        
-        def is_word_char(ch):
-            if ch == '_':
-                return True
-            cat = unicodedata.category(ch)
-            return cat[0] in ('L', 'N', 'M')
         
         if self.selection.has_selection():
             self.delete_selection()
@@ -1126,76 +1316,26 @@ class VirtualBuffer(GObject.Object):
                 next_line = self.get_line(ln + 1)
                 new_line = line + next_line
                 
-                if ln in self.inserted_lines:
-                    self.inserted_lines[ln] = new_line
-                else:
-                    self.edits[ln] = new_line
-                
-                new_ins = {}
-                for k, v in self.inserted_lines.items():
-                    if k <= ln:
-                        new_ins[k] = v
-                    elif k == ln + 1:
-                        pass
-                    else:
-                        new_ins[k - 1] = v
-                
-                new_ed = {}
-                for k, v in self.edits.items():
-                    if k <= ln:
-                        new_ed[k] = v
-                    elif k == ln + 1:
-                        pass
-                    else:
-                        new_ed[k - 1] = v
-                
-                new_del = set()
-                for k in self.deleted_lines:
-                    if k <= ln:
-                        new_del.add(k)
-                    elif k == ln + 1:
-                        pass
-                    else:
-                        new_del.add(k - 1)
+                self.overlay[ln] = new_line
                 
-                self.inserted_lines = new_ins
-                self.edits = new_ed
-                self.deleted_lines = new_del
+                # Drop the merged next line and pull later virtual lines up
+                self._drop_lines(ln + 1, ln + 1)
+
                 self._add_offset(ln + 2, -1)
             
-            self.emit("changed")
+            self._mark_changed()
             return
         
-        end_col = col
-        while end_col < len(line) and line[end_col].isspace():
-            end_col += 1
-        
-        if end_col < len(line):
-            if is_word_char(line[end_col]):
-                while end_col < len(line) and is_word_char(line[end_col]):
-                    end_col += 1
-            elif not line[end_col].isspace():
-                while end_col < len(line) and not line[end_col].isspace() and not is_word_char(line[end_col]):
-                    end_col += 1
+        end_col = word_right(line, col)
         
         new_line = line[:col] + line[end_col:]
         
-        if ln in self.inserted_lines:
-            self.inserted_lines[ln] = new_line
-        else:
-            self.edits[ln] = new_line
+        self.overlay[ln] = new_line
         
-        self.emit("changed")
+        self._mark_changed()
 
     def delete_word_backward(self):
         """Delete from cursor to start of current word (Ctrl+Backspace)"""
-        import unicodedata
-        
-        def is_word_char(ch):
-            if ch == '_':
-                return True
-            cat = unicodedata.category(ch)
-            return cat[0] in ('L', 'N', 'M')
         
         if self.selection.has_selection():
             self.delete_selection()
@@ -1210,70 +1350,27 @@ class VirtualBuffer(GObject.Object):
                 prev_line = self.get_line(ln - 1)
                 new_line = prev_line + line
                 
-                if ln - 1 in self.inserted_lines:
-                    self.inserted_lines[ln - 1] = new_line
-                else:
-                    self.edits[ln - 1] = new_line
-                
-                new_ins = {}
-                for k, v in self.inserted_lines.items():
-                    if k < ln:
-                        new_ins[k] = v
-                    elif k == ln:
-                        pass
-                    else:
-                        new_ins[k - 1] = v
+                self.overlay[ln - 1] = new_line
                 
-                new_ed = {}
-                for k, v in self.edits.items():
-                    if k < ln:
-                        new_ed[k] = v
-                    elif k == ln:
-                        pass
-                    else:
-                        new_ed[k - 1] = v
-                
-                new_del = set()
-                for k in self.deleted_lines:
-                    if k < ln:
-                        new_del.add(k)
-                    elif k == ln:
-                        pass
-                    else:
-                        new_del.add(k - 1)
-                
-                self.inserted_lines = new_ins
-                self.edits = new_ed
-                self.deleted_lines = new_del
-                self._add_offset(ln + 1, -1)
+                # Drop this line and pull later virtual lines up
+                self._drop_lines(ln, ln)
+
+                self._add_offset(ln + 1, -1)
                 
                 self.cursor_line = ln - 1
                 self.cursor_col = len(prev_line)
             
-            self.emit("changed")
+            self._mark_changed()
             return
         
-        start_col = col
-        while start_col > 0 and line[start_col - 1].isspace():
-            start_col -= 1
-        
-        if start_col > 0:
-            if is_word_char(line[start_col - 1]):
-                while start_col > 0 and is_word_char(line[start_col - 1]):
-                    start_col -= 1
-            elif not line[start_col - 1].isspace():
-                while start_col > 0 and not line[start_col - 1].isspace() and not is_word_char(line[start_col - 1]):
-                    start_col -= 1
+        start_col = word_left(line, col)
         
         new_line = line[:start_col] + line[col:]
         
-        if ln in self.inserted_lines:
-            self.inserted_lines[ln] = new_line
-        else:
-            self.edits[ln] = new_line
+        self.overlay[ln] = new_line
         
         self.cursor_col = start_col
-        self.emit("changed")
+        self._mark_changed()
     
     def delete_to_line_end(self):
         """Delete from cursor to end of line (Ctrl+Shift+Delete)"""
@@ -1287,12 +1384,9 @@ class VirtualBuffer(GObject.Object):
         
         new_line = line[:col]
         
-        if ln in self.inserted_lines:
-            self.inserted_lines[ln] = new_line
-        else:
-            self.edits[ln] = new_line
+        self.overlay[ln] = new_line
         
-        self.emit("changed")
+        self._mark_changed()
     
     def delete_to_line_start(self):
         """Delete from cursor to start of line (Ctrl+Shift+Backspace)"""
@@ -1306,149 +1400,33 @@ class VirtualBuffer(GObject.Object):
         
         new_line = line[col:]
         
-        if ln in self.inserted_lines:
-            self.inserted_lines[ln] = new_line
-        else:
-            self.edits[ln] = new_line
+        self.overlay[ln] = new_line
         
         self.cursor_col = 0
-        self.emit("changed")
+        self._mark_changed()
     
     def delete_current_line(self):
         """Delete the entire current line including newline (Ctrl+D)"""
         ln = self.cursor_line
         
         if self.total() == 1:
-            if ln in self.inserted_lines:
-                self.inserted_lines[ln] = ""
-            else:
-                self.edits[ln] = ""
+            self.overlay[ln] = ""
             self.cursor_col = 0
-            self.emit("changed")
+            self._mark_changed()
             return
         
-        new_ins = {}
-        for k, v in self.inserted_lines.items():
-            if k < ln:
-                new_ins[k] = v
-            elif k == ln:
-                pass
-            else:
-                new_ins[k - 1] = v
-        
-        new_ed = {}
-        for k, v in self.edits.items():
-            if k < ln:
-                new_ed[k] = v
-            elif k == ln:
-                pass
-            else:
-                new_ed[k - 1] = v
-        
-        new_del = set()
-        for k in self.deleted_lines:
-            if k < ln:
-                new_del.add(k)
-            elif k == ln:
-                pass
-            else:
-                new_del.add(k - 1)
-        
-        self.inserted_lines = new_ins
-        self.edits = new_ed
-        self.deleted_lines = new_del
+        # Drop this line and pull later virtual lines up
+        self._drop_lines(ln, ln)
+
         self._add_offset(ln + 1, -1)
         
         if ln >= self.total():
             self.cursor_line = self.total() - 1
         
         self.cursor_col = 0
-        self.emit("changed")
-
-
-
-    def insert_newline(self):
-        if self.selection.has_selection():
-            self.delete_selection()
-        
-        ln = self.cursor_line
-        col = self.cursor_col
-
-        old_line = self.get_line(ln)
-        left = old_line[:col]
-        right = old_line[col:]
-
-        # Update current line
-        if ln in self.inserted_lines:
-            self.inserted_lines[ln] = left
-        else:
-            self.edits[ln] = left
-        
-        # Insert new line
-        self.inserted_lines[ln + 1] = right
-        
-        # Track offset change (1 line inserted)
-        self._add_offset(ln + 1, 1)
-        
-        self.cursor_line = ln + 1
-        self.cursor_col = 0
-        self.selection.clear()
-        self.emit("changed")
-        
-
-
-    
-
-    def _logical_to_physical(self, logical_line):
-        if not self.file:
-            return logical_line
-
-        if not self.line_offsets:
-            return logical_line
-
-        # Extract only logical_line keys for binary search
-        keys = [lo for lo, _ in self.line_offsets]
-        idx = bisect.bisect_right(keys, logical_line) - 1
-
-        if idx < 0:
-            return logical_line
-
-        _, offset = self.line_offsets[idx]
-        return logical_line - offset
-
-    def _add_offset(self, at_line, delta):
-        # Fast path: empty offsets
-        if not self.line_offsets:
-            self.line_offsets.append((at_line, delta))
-            return
-
-        import bisect
-        keys = [lo for lo, _ in self.line_offsets]
-        pos = bisect.bisect_left(keys, at_line)
-
-        # Case 1: exact match → update
-        if pos < len(self.line_offsets) and self.line_offsets[pos][0] == at_line:
-            old = self.line_offsets[pos][1]
-            new_val = old + delta
-            self.line_offsets[pos] = (at_line, new_val)
-
-            # Update following offsets
-            for i in range(pos + 1, len(self.line_offsets)):
-                lo, off = self.line_offsets[i]
-                self.line_offsets[i] = (lo, off + delta)
-
-            return
-
-        # Case 2: insert new offset
-        # Find previous offset value
-        prev_offset = self.line_offsets[pos-1][1] if pos > 0 else 0
+        self._mark_changed()
 
-        self.line_offsets.insert(pos, (at_line, prev_offset + delta))
 
-        # Update subsequent offsets
-        for i in range(pos + 1, len(self.line_offsets)):
-            lo, off = self.line_offsets[i]
-            self.line_offsets[i] = (lo, off + delta)
 
     def insert_newline(self):
         if self.selection.has_selection():
@@ -1463,33 +1441,13 @@ class VirtualBuffer(GObject.Object):
         right = old[col:]
 
         # Update left part
-        if ln in self.inserted_lines:
-            self.inserted_lines[ln] = left
-        else:
-            self.edits[ln] = left
+        self.overlay[ln] = left
 
         # ---- SHIFT ONLY VIRTUAL LINES ----
-        # Inserted
-        new_ins = {}
-        for k, v in self.inserted_lines.items():
-            new_ins[k if k <= ln else k+1] = v
-
-        # Edits
-        new_ed = {}
-        for k, v in self.edits.items():
-            new_ed[k if k <= ln else k+1] = v
-
-        # Deleted
-        new_del = set()
-        for k in self.deleted_lines:
-            new_del.add(k if k <= ln else k+1)
+        self._shift_lines_above(ln, 1)
 
         # Insert right half as NEW line at ln+1
-        new_ins[ln + 1] = right
-
-        self.inserted_lines = new_ins
-        self.edits = new_ed
-        self.deleted_lines = new_del
+        self.overlay[ln + 1] = right
 
         # Track logical offset (1 new line)
         self._add_offset(ln + 1, 1)
@@ -1498,17 +1456,16 @@ class VirtualBuffer(GObject.Object):
         self.cursor_line = ln + 1
         self.cursor_col = 0
         self.selection.clear()
-        self.emit("changed")
+        self._mark_changed()
         
+    @batched_changes
     def move_word_left_with_text(self):
         """Move text left: full words swap, partial selection moves 1 char (Alt+Left)"""
         ln = self.cursor_line
         col = self.cursor_col
         line = self.get_line(ln)
         
-        def is_word_separator(ch):
-            """Check if character is a word separator (space, underscore, or punctuation)"""
-            return ch in ' _' or not ch.isalnum()
+        marks = word_marks(line)
         
         # Check if we have a selection
         if self.selection.has_selection():
@@ -1547,9 +1504,7 @@ class VirtualBuffer(GObject.Object):
                         char_before = '\n'
                         
                     # 3. Extend selection to include char before
-                    # NOTE: set_start resets end, so we must restore the end
-                    self.selection.set_start(prev_ln, prev_col)
-                    self.selection.set_end(end_ln, end_col)
+                    self.selection.set_range(prev_ln, prev_col, end_ln, end_col)
                     
                     # 4. Delete extended range
                     self.delete_selection()
@@ -1583,10 +1538,9 @@ class VirtualBuffer(GObject.Object):
                         sel_end_ln = ins_start_ln + len(sel_lines) - 1
                         sel_end_col = len(sel_lines[-1])
                     
-                    self.selection.set_start(ins_start_ln, ins_start_col)
-                    self.selection.set_end(sel_end_ln, sel_end_col)
+                    self.selection.set_range(ins_start_ln, ins_start_col, sel_end_ln, sel_end_col)
                     
-                    self.emit("changed")
+                    self._mark_changed()
                     return
                 
                 selected_text = line[start_col:end_col]
@@ -1595,15 +1549,15 @@ class VirtualBuffer(GObject.Object):
                 is_full_word_selection = True
                 
                 # Check start boundary
-                if start_col > 0 and start_col <= len(line) and not is_word_separator(line[start_col - 1]):
+                if start_col > 0 and start_col <= len(line) and marks[start_col - 1] == 'W':
                     is_full_word_selection = False
-                if start_col < len(line) and is_word_separator(line[start_col]):
+                if start_col < len(line) and marks[start_col] == 'S':
                     is_full_word_selection = False
                     
                 # Check end boundary
-                if end_col < len(line) and not is_word_separator(line[end_col]):
+                if end_col < len(line) and marks[end_col] == 'W':
                     is_full_word_selection = False
-                if end_col > 0 and end_col <= len(line) and is_word_separator(line[end_col - 1]):
+                if end_col > 0 and end_col <= len(line) and marks[end_col - 1] == 'S':
                     is_full_word_selection = False
                 
                 # Check state: if we were moving partially, KEEP moving partially
@@ -1618,10 +1572,7 @@ class VirtualBuffer(GObject.Object):
                 if is_full_word_selection:
                     # Full word(s) selected - swap with previous word
                     # Find previous word
-                    prev_word_end = start_col - 1
-                    while prev_word_end >= 0 and prev_word_end < len(line) and is_word_separator(line[prev_word_end]):
-                        prev_word_end -= 1
-                    prev_word_end += 1
+                    prev_word_end = skip_marks_left(marks, start_col, 'S')
                     
                     if prev_word_end == 0:
                         # No previous word on this line - try previous line
@@ -1633,11 +1584,11 @@ class VirtualBuffer(GObject.Object):
                         # Skip empty lines to find the previous word
                         while prev_ln >= 0:
                             prev_line = self.get_line(prev_ln)
+                            prev_marks = word_marks(prev_line)
                             
                             # Find last word on this line
                             prev_word_end = len(prev_line)
-                            while prev_word_end > 0 and is_word_separator(prev_line[prev_word_end - 1]):
-                                prev_word_end -= 1
+                            prev_word_end = skip_marks_left(prev_marks, prev_word_end, 'S')
                             
                             # If we found a word on this line, break
                             if prev_word_end > 0:
@@ -1651,8 +1602,7 @@ class VirtualBuffer(GObject.Object):
                             return  # No word found
                         
                         prev_word_start = prev_word_end
-                        while prev_word_start > 0 and not is_word_separator(prev_line[prev_word_start - 1]):
-                            prev_word_start -= 1
+                        prev_word_start = skip_marks_left(prev_marks, prev_word_start, 'W')
                         
                         prev_word = prev_line[prev_word_start:prev_word_end]
                         
@@ -1661,23 +1611,16 @@ class VirtualBuffer(GObject.Object):
                         
                         # Update current line: replace selected text with prev_word at the same position
                         new_current_line = line[:start_col] + prev_word + line[end_col:]
-                        if ln in self.inserted_lines:
-                            self.inserted_lines[ln] = new_current_line
-                        else:
-                            self.edits[ln] = new_current_line
+                        self.overlay[ln] = new_current_line
                         
                         # Update previous line: replace prev_word with selected text at the same position
                         new_prev_line = (prev_line[:prev_word_start] + 
                                        selected_text + 
                                        prev_line[prev_word_end:])
-                        if prev_ln in self.inserted_lines:
-                            self.inserted_lines[prev_ln] = new_prev_line
-                        else:
-                            self.edits[prev_ln] = new_prev_line
+                        self.overlay[prev_ln] = new_prev_line
                         
                         # Update selection to moved position on previous line
-                        self.selection.set_start(prev_ln, prev_word_start)
-                        self.selection.set_end(prev_ln, prev_word_start + len(selected_text))
+                        self.selection.set_range(prev_ln, prev_word_start, prev_ln, prev_word_start + len(selected_text))
                         self.cursor_line = prev_ln
                         self.cursor_col = prev_word_start
                         
@@ -1685,12 +1628,11 @@ class VirtualBuffer(GObject.Object):
                         self.last_move_was_partial = False
                         self.expected_selection = (prev_ln, prev_word_start, prev_ln, prev_word_start + len(selected_text))
                         
-                        self.emit("changed")
+                        self._mark_changed()
                         return
                     
                     prev_word_start = prev_word_end - 1
-                    while prev_word_start > 0 and prev_word_start <= len(line) and not is_word_separator(line[prev_word_start - 1]):
-                        prev_word_start -= 1
+                    prev_word_start = skip_marks_left(marks, prev_word_start, 'W')
                     
                     prev_word = line[prev_word_start:prev_word_end]
                     separators = line[prev_word_end:start_col]
@@ -1703,21 +1645,17 @@ class VirtualBuffer(GObject.Object):
                                line[end_col:])
                     
                     # Update line
-                    if ln in self.inserted_lines:
-                        self.inserted_lines[ln] = new_line
-                    else:
-                        self.edits[ln] = new_line
+                    self.overlay[ln] = new_line
                     
                     # Update selection to moved position
-                    self.selection.set_start(ln, prev_word_start)
-                    self.selection.set_end(ln, prev_word_start + len(selected_text))
+                    self.selection.set_range(ln, prev_word_start, ln, prev_word_start + len(selected_text))
                     self.cursor_col = prev_word_start
                     
                     # Update state
                     self.last_move_was_partial = False
                     self.expected_selection = (ln, prev_word_start, ln, prev_word_start + len(selected_text))
                     
-                    self.emit("changed")
+                    self._mark_changed()
                 else:
                     # Partial selection - ALWAYS use character-wise movement
                     # 1. Identify char before
@@ -1741,8 +1679,7 @@ class VirtualBuffer(GObject.Object):
                     selected_text = self.get_selected_text()
                     
                     # 3. Extend selection to include char before
-                    self.selection.set_start(prev_ln, prev_col)
-                    self.selection.set_end(end_ln, end_col)
+                    self.selection.set_range(prev_ln, prev_col, end_ln, end_col)
                     
                     # 4. Delete extended range
                     self.delete_selection()
@@ -1765,8 +1702,7 @@ class VirtualBuffer(GObject.Object):
                         sel_end_ln = ins_start_ln + len(sel_lines) - 1
                         sel_end_col = len(sel_lines[-1])
                     
-                    self.selection.set_start(ins_start_ln, ins_start_col)
-                    self.selection.set_end(sel_end_ln, sel_end_col)
+                    self.selection.set_range(ins_start_ln, ins_start_col, sel_end_ln, sel_end_col)
                     
                     # Update cursor to end of selection
                     self.cursor_line = sel_end_ln
@@ -1776,24 +1712,22 @@ class VirtualBuffer(GObject.Object):
                     self.last_move_was_partial = True
                     self.expected_selection = (ins_start_ln, ins_start_col, sel_end_ln, sel_end_col)
                     
-                    self.emit("changed")
+                    self._mark_changed()
                 return
         
         # No selection - swap current word with previous word
         # Only operate if cursor is on a word or right after a word
-        if col > 0 and col < len(line) and is_word_separator(line[col]) and not is_word_separator(line[col - 1]):
+        if col > 0 and col < len(line) and marks[col] == 'S' and marks[col - 1] == 'W':
             # Cursor is right after a word (before a separator) - find that word and move it left
             word_end = col
             word_start = col
-            while word_start > 0 and word_start - 1 < len(line) and not is_word_separator(line[word_start - 1]):
-                word_start -= 1
-        elif col >= len(line) and col > 0 and not is_word_separator(line[col - 1]):
+            word_start = skip_marks_left(marks, word_start, 'W')
+        elif col >= len(line) and col > 0 and marks[col - 1] == 'W':
             # Cursor is at end of line, right after a word character
             word_end = col
             word_start = col
-            while word_start > 0 and not is_word_separator(line[word_start - 1]):
-                word_start -= 1
-        elif col < len(line) and is_word_separator(line[col]):
+            word_start = skip_marks_left(marks, word_start, 'W')
+        elif col < len(line) and marks[col] == 'S':
             # Cursor is on a separator (not right after a word) - do nothing
             return
         elif col >= len(line):
@@ -1802,22 +1736,17 @@ class VirtualBuffer(GObject.Object):
         else:
             # Cursor is on a word character - find current word boundaries
             word_start = col
-            while word_start > 0 and word_start <= len(line) and not is_word_separator(line[word_start - 1]):
-                word_start -= 1
+            word_start = skip_marks_left(marks, word_start, 'W')
             
             word_end = col
-            while word_end < len(line) and not is_word_separator(line[word_end]):
-                word_end += 1
+            word_end = skip_marks_right(marks, word_end, 'W')
         
         # if word_start == 0:
         #    return  # Can't move left
 
         
         # Find previous word
-        prev_word_end = word_start - 1
-        while prev_word_end >= 0 and prev_word_end < len(line) and is_word_separator(line[prev_word_end]):
-            prev_word_end -= 1
-        prev_word_end += 1
+        prev_word_end = skip_marks_left(marks, word_start, 'S')
         
         if prev_word_end == 0:
             # No previous word on this line - try previous line
@@ -1829,11 +1758,11 @@ class VirtualBuffer(GObject.Object):
             # Skip empty lines to find the previous word
             while prev_ln >= 0:
                 prev_line = self.get_line(prev_ln)
+                prev_marks = word_marks(prev_line)
                 
                 # Find last word on this line
                 prev_word_end = len(prev_line)
-                while prev_word_end > 0 and is_word_separator(prev_line[prev_word_end - 1]):
-                    prev_word_end -= 1
+                prev_word_end = skip_marks_left(prev_marks, prev_word_end, 'S')
                 
                 # If we found a word on this line, break
                 if prev_word_end > 0:
@@ -1847,41 +1776,32 @@ class VirtualBuffer(GObject.Object):
                 return  # No word found
             
             prev_word_start = prev_word_end
-            while prev_word_start > 0 and not is_word_separator(prev_line[prev_word_start - 1]):
-                prev_word_start -= 1
+            prev_word_start = skip_marks_left(prev_marks, prev_word_start, 'W')
             
             prev_word = prev_line[prev_word_start:prev_word_end]
             current_word = line[word_start:word_end]
             
             # Update current line: replace current_word with prev_word at the same position
             new_current_line = line[:word_start] + prev_word + line[word_end:]
-            if ln in self.inserted_lines:
-                self.inserted_lines[ln] = new_current_line
-            else:
-                self.edits[ln] = new_current_line
+            self.overlay[ln] = new_current_line
             
             # Update previous line: replace prev_word with current_word at the same position
             new_prev_line = (prev_line[:prev_word_start] + 
                            current_word + 
                            prev_line[prev_word_end:])
-            if prev_ln in self.inserted_lines:
-                self.inserted_lines[prev_ln] = new_prev_line
-            else:
-                self.edits[prev_ln] = new_prev_line
+            self.overlay[prev_ln] = new_prev_line
             
             # Update cursor to moved position on previous line
             self.cursor_line = prev_ln
             self.cursor_col = prev_word_start + len(current_word)
             # Clear selection
-            self.selection.set_start(self.cursor_line, self.cursor_col)
-            self.selection.set_end(self.cursor_line, self.cursor_col)
+            self.selection.set_range(self.cursor_line, self.cursor_col, self.cursor_line, self.cursor_col)
             
-            self.emit("changed")
+            self._mark_changed()
             return
         
         prev_word_start = prev_word_end - 1
-        while prev_word_start > 0 and prev_word_start <= len(line) and not is_word_separator(line[prev_word_start - 1]):
-            prev_word_start -= 1
+        prev_word_start = skip_marks_left(marks, prev_word_start, 'W')
         
         current_word = line[word_start:word_end]
         prev_word = line[prev_word_start:prev_word_end]
@@ -1895,27 +1815,22 @@ class VirtualBuffer(GObject.Object):
                    line[word_end:])
         
         # Update line
-        if ln in self.inserted_lines:
-            self.inserted_lines[ln] = new_line
-        else:
-            self.edits[ln] = new_line
+        self.overlay[ln] = new_line
         
         # Move cursor and select
         self.cursor_col = prev_word_start
-        self.selection.set_start(ln, prev_word_start)
-        self.selection.set_end(ln, prev_word_start + len(current_word))
+        self.selection.set_range(ln, prev_word_start, ln, prev_word_start + len(current_word))
         
-        self.emit("changed")
+        self._mark_changed()
     
+    @batched_changes
     def move_word_right_with_text(self):
         """Move text right: full words swap, partial selection moves 1 char (Alt+Right)"""
         ln = self.cursor_line
         col = self.cursor_col
         line = self.get_line(ln)
         
-        def is_word_separator(ch):
-            """Check if character is a word separator (space, underscore, or punctuation)"""
-            return ch in ' _' or not ch.isalnum()
+        marks = word_marks(line)
         
         # Check if we have a selection
         if self.selection.has_selection():
@@ -1994,10 +1909,9 @@ class VirtualBuffer(GObject.Object):
                     sel_end_ln = self.cursor_line
                     sel_end_col = self.cursor_col
                     
-                    self.selection.set_start(sel_start_ln, sel_start_col)
-                    self.selection.set_end(sel_end_ln, sel_end_col)
+                    self.selection.set_range(sel_start_ln, sel_start_col, sel_end_ln, sel_end_col)
                     
-                    self.emit("changed")
+                    self._mark_changed()
                     return
                 
                 selected_text = line[start_col:end_col]
@@ -2006,15 +1920,15 @@ class VirtualBuffer(GObject.Object):
                 is_full_word_selection = True
                 
                 # Check start boundary
-                if start_col > 0 and start_col <= len(line) and not is_word_separator(line[start_col - 1]):
+                if start_col > 0 and start_col <= len(line) and marks[start_col - 1] == 'W':
                     is_full_word_selection = False
-                if start_col < len(line) and is_word_separator(line[start_col]):
+                if start_col < len(line) and marks[start_col] == 'S':
                     is_full_word_selection = False
                     
                 # Check end boundary
-                if end_col < len(line) and not is_word_separator(line[end_col]):
+                if end_col < len(line) and marks[end_col] == 'W':
                     is_full_word_selection = False
-                if end_col > 0 and end_col <= len(line) and is_word_separator(line[end_col - 1]):
+                if end_col > 0 and end_col <= len(line) and marks[end_col - 1] == 'S':
                     is_full_word_selection = False
                 
                 # Check state: if we were moving partially, KEEP moving partially
@@ -2030,8 +1944,7 @@ class VirtualBuffer(GObject.Object):
                     # Full word(s) selected - swap with next word
                     # Find next word
                     next_word_start = end_col
-                    while next_word_start < len(line) and is_word_separator(line[next_word_start]):
-                        next_word_start += 1
+                    next_word_start = skip_marks_right(marks, next_word_start, 'S')
                     
                     if next_word_start == len(line):
                         # No next word on this line - try next line
@@ -2043,11 +1956,11 @@ class VirtualBuffer(GObject.Object):
                         # Skip empty lines to find the next word
                         while next_ln < self.total():
                             next_line = self.get_line(next_ln)
+                            next_marks = word_marks(next_line)
                             
                             # Find first word on this line
                             next_word_start = 0
-                            while next_word_start < len(next_line) and is_word_separator(next_line[next_word_start]):
-                                next_word_start += 1
+                            next_word_start = skip_marks_right(next_marks, next_word_start, 'S')
                             
                             # If we found a word on this line, break
                             if next_word_start < len(next_line):
@@ -2061,8 +1974,7 @@ class VirtualBuffer(GObject.Object):
                             return  # No word found
                         
                         next_word_end = next_word_start
-                        while next_word_end < len(next_line) and not is_word_separator(next_line[next_word_end]):
-                            next_word_end += 1
+                        next_word_end = skip_marks_right(next_marks, next_word_end, 'W')
                         
                         next_word = next_line[next_word_start:next_word_end]
                         
@@ -2074,21 +1986,14 @@ class VirtualBuffer(GObject.Object):
                         
                         # Update current line: keep prefix + next_word + everything after selected word
                         new_current_line = line[:start_col] + next_word + after_selected
-                        if ln in self.inserted_lines:
-                            self.inserted_lines[ln] = new_current_line
-                        else:
-                            self.edits[ln] = new_current_line
+                        self.overlay[ln] = new_current_line
                         
                         # Update next line: replace next_word with selected text (preserves any punctuation in selection)
                         new_next_line = next_line[:next_word_start] + selected_text + next_line[next_word_end:]
-                        if next_ln in self.inserted_lines:
-                            self.inserted_lines[next_ln] = new_next_line
-                        else:
-                            self.edits[next_ln] = new_next_line
+                        self.overlay[next_ln] = new_next_line
                         
                         # Update selection to moved position on next line
-                        self.selection.set_start(next_ln, next_word_start)
-                        self.selection.set_end(next_ln, next_word_start + len(selected_text))
+                        self.selection.set_range(next_ln, next_word_start, next_ln, next_word_start + len(selected_text))
                         self.cursor_line = next_ln
                         self.cursor_col = next_word_start + len(selected_text)
                         
@@ -2096,12 +2001,11 @@ class VirtualBuffer(GObject.Object):
                         self.last_move_was_partial = False
                         self.expected_selection = (next_ln, next_word_start, next_ln, next_word_start + len(selected_text))
                         
-                        self.emit("changed")
+                        self._mark_changed()
                         return
 
                     next_word_end = next_word_start
-                    while next_word_end < len(line) and not is_word_separator(line[next_word_end]):
-                        next_word_end += 1
+                    next_word_end = skip_marks_right(marks, next_word_end, 'W')
                     
                     next_word = line[next_word_start:next_word_end]
                     separators = line[end_col:next_word_start]
@@ -2114,22 +2018,18 @@ class VirtualBuffer(GObject.Object):
                                line[next_word_end:])
                     
                     # Update line
-                    if ln in self.inserted_lines:
-                        self.inserted_lines[ln] = new_line
-                    else:
-                        self.edits[ln] = new_line
+                    self.overlay[ln] = new_line
                     
                     # Update selection to moved position
                     new_sel_start = start_col + len(next_word) + len(separators)
-                    self.selection.set_start(ln, new_sel_start)
-                    self.selection.set_end(ln, new_sel_start + len(selected_text))
+                    self.selection.set_range(ln, new_sel_start, ln, new_sel_start + len(selected_text))
                     self.cursor_col = new_sel_start + len(selected_text)
                     
                     # Update state
                     self.last_move_was_partial = False
                     self.expected_selection = (ln, new_sel_start, ln, new_sel_start + len(selected_text))
                     
-                    self.emit("changed")
+                    self._mark_changed()
                 else:
                     # Partial selection - ALWAYS use character-wise movement
                     # 1. Identify char after
@@ -2179,8 +2079,7 @@ class VirtualBuffer(GObject.Object):
                     sel_end_ln = self.cursor_line
                     sel_end_col = self.cursor_col
                     
-                    self.selection.set_start(sel_start_ln, sel_start_col)
-                    self.selection.set_end(sel_end_ln, sel_end_col)
+                    self.selection.set_range(sel_start_ln, sel_start_col, sel_end_ln, sel_end_col)
                     
                     # Update cursor to end of selection
                     self.cursor_line = sel_end_ln
@@ -2190,24 +2089,22 @@ class VirtualBuffer(GObject.Object):
                     self.last_move_was_partial = True
                     self.expected_selection = (sel_start_ln, sel_start_col, sel_end_ln, sel_end_col)
                     
-                    self.emit("changed")
+                    self._mark_changed()
                 return
         
         # No selection - swap current word with next word
         # Only operate if cursor is on a word or right after a word
-        if col > 0 and col < len(line) and is_word_separator(line[col]) and not is_word_separator(line[col - 1]):
+        if col > 0 and col < len(line) and marks[col] == 'S' and marks[col - 1] == 'W':
             # Cursor is right after a word (before a separator) - find that word and move it right
             word_end = col
             word_start = col
-            while word_start > 0 and not is_word_separator(line[word_start - 1]):
-                word_start -= 1
-        elif col >= len(line) and col > 0 and not is_word_separator(line[col - 1]):
+            word_start = skip_marks_left(marks, word_start, 'W')
+        elif col >= len(line) and col > 0 and marks[col - 1] == 'W':
             # Cursor is at end of line, right after a word character
             word_end = col
             word_start = col
-            while word_start > 0 and not is_word_separator(line[word_start - 1]):
-                word_start -= 1
-        elif col < len(line) and is_word_separator(line[col]):
+            word_start = skip_marks_left(marks, word_start, 'W')
+        elif col < len(line) and marks[col] == 'S':
             # Cursor is on a separator (not right after a word) - do nothing
             return
         elif col >= len(line):
@@ -2216,17 +2113,14 @@ class VirtualBuffer(GObject.Object):
         else:
             # Cursor is on a word character - find current word boundaries
             word_start = col
-            while word_start > 0 and word_start <= len(line) and not is_word_separator(line[word_start - 1]):
-                word_start -= 1
+            word_start = skip_marks_left(marks, word_start, 'W')
             
             word_end = col
-            while word_end < len(line) and not is_word_separator(line[word_end]):
-                word_end += 1
+            word_end = skip_marks_right(marks, word_end, 'W')
         
         # Find next word
         next_word_start = word_end
-        while next_word_start < len(line) and is_word_separator(line[next_word_start]):
-            next_word_start += 1
+        next_word_start = skip_marks_right(marks, next_word_start, 'S')
         
         if next_word_start >= len(line):
             # No next word on this line - try next line
@@ -2239,11 +2133,11 @@ class VirtualBuffer(GObject.Object):
             # Skip empty lines to find the next word
             while next_ln < self.total():
                 next_line = self.get_line(next_ln)
+                next_marks = word_marks(next_line)
                 
                 # Find first word on this line
                 next_word_start = 0
-                while next_word_start < len(next_line) and is_word_separator(next_line[next_word_start]):
-                    next_word_start += 1
+                next_word_start = skip_marks_right(next_marks, next_word_start, 'S')
                 
                 # If we found a word on this line, break
                 if next_word_start < len(next_line):
@@ -2257,8 +2151,7 @@ class VirtualBuffer(GObject.Object):
                 return  # No word found
             
             next_word_end = next_word_start
-            while next_word_end < len(next_line) and not is_word_separator(next_line[next_word_end]):
-                next_word_end += 1
+            next_word_end = skip_marks_right(next_marks, next_word_end, 'W')
             
             next_word = next_line[next_word_start:next_word_end]
             current_word = line[word_start:word_end]
@@ -2268,31 +2161,23 @@ class VirtualBuffer(GObject.Object):
             
             # Update current line: prefix + next_word + everything that was after current_word
             new_current_line = line[:word_start] + next_word + after_current_word
-            if ln in self.inserted_lines:
-                self.inserted_lines[ln] = new_current_line
-            else:
-                self.edits[ln] = new_current_line
+            self.overlay[ln] = new_current_line
             
             # Update next line: keep leading separators, add current_word, keep rest
             new_next_line = next_line[:next_word_start] + current_word + next_line[next_word_end:]
-            if next_ln in self.inserted_lines:
-                self.inserted_lines[next_ln] = new_next_line
-            else:
-                self.edits[next_ln] = new_next_line
+            self.overlay[next_ln] = new_next_line
             
             # Update cursor to moved position on next line
             self.cursor_line = next_ln
             self.cursor_col = next_word_start + len(current_word)
             # Clear selection
-            self.selection.set_start(self.cursor_line, self.cursor_col)
-            self.selection.set_end(self.cursor_line, self.cursor_col)
+            self.selection.set_range(self.cursor_line, self.cursor_col, self.cursor_line, self.cursor_col)
             
-            self.emit("changed")
+            self._mark_changed()
             return
 
         next_word_end = next_word_start
-        while next_word_end < len(line) and not is_word_separator(line[next_word_end]):
-            next_word_end += 1
+        next_word_end = skip_marks_right(marks, next_word_end, 'W')
         
         current_word = line[word_start:word_end]
         next_word = line[next_word_start:next_word_end]
@@ -2306,10 +2191,7 @@ class VirtualBuffer(GObject.Object):
                    line[next_word_end:])
         
         # Update line
-        if ln in self.inserted_lines:
-            self.inserted_lines[ln] = new_line
-        else:
-            self.edits[ln] = new_line
+        self.overlay[ln] = new_line
         
         # Update cursor position
         new_cursor_col = word_start + len(next_word) + len(separators) + len(current_word)
@@ -2317,7 +2199,7 @@ class VirtualBuffer(GObject.Object):
         self.selection.set_start(ln, new_cursor_col)
         self.selection.set_end(ln, new_cursor_col) # This line was syntactically incorrect in the instruction, assuming it meant to clear selection or set cursor as end. Reverting to original behavior of selecting the moved word.
         
-        self.emit("changed")
+        self._mark_changed()
     
     def move_line_up_with_text(self):
         """Move current line or selection up one line (Alt+Up)"""
@@ -2352,32 +2234,22 @@ class VirtualBuffer(GObject.Object):
                         selected_lines.append(self.get_line(i))
                     
                     # Move line above to the bottom of selection
-                    if start_ln - 1 in self.inserted_lines:
-                        self.inserted_lines[start_ln - 1] = selected_lines[0]
-                    else:
-                        self.edits[start_ln - 1] = selected_lines[0]
+                    self.overlay[start_ln - 1] = selected_lines[0]
                     
                     # Shift all other selected lines up
                     for i in range(1, len(selected_lines)):
-                        if start_ln - 1 + i in self.inserted_lines:
-                            self.inserted_lines[start_ln - 1 + i] = selected_lines[i]
-                        else:
-                            self.edits[start_ln - 1 + i] = selected_lines[i]
+                        self.overlay[start_ln - 1 + i] = selected_lines[i]
                     
                     # Put line_above at the end
-                    if effective_end_ln in self.inserted_lines:
-                        self.inserted_lines[effective_end_ln] = line_above
-                    else:
-                        self.edits[effective_end_ln] = line_above
+                    self.overlay[effective_end_ln] = line_above
                     
                     # Update selection to new position
                     # We shift the original bounds up by 1
-                    self.selection.set_start(start_ln - 1, start_col)
-                    self.selection.set_end(end_ln - 1, end_col)
+                    self.selection.set_range(start_ln - 1, start_col, end_ln - 1, end_col)
                     self.cursor_line = start_ln - 1
                     self.cursor_col = start_col
                     
-                    self.emit("changed")
+                    self._mark_changed()
                     return
                 
                 # Single-line selection - move text to previous line
@@ -2400,23 +2272,16 @@ class VirtualBuffer(GObject.Object):
                 new_prev_line = prev_line[:insert_pos] + selected_text + prev_line[insert_pos:]
                 
                 # Update both lines
-                if ln - 1 in self.inserted_lines:
-                    self.inserted_lines[ln - 1] = new_prev_line
-                else:
-                    self.edits[ln - 1] = new_prev_line
+                self.overlay[ln - 1] = new_prev_line
                 
-                if ln in self.inserted_lines:
-                    self.inserted_lines[ln] = new_current_line
-                else:
-                    self.edits[ln] = new_current_line
+                self.overlay[ln] = new_current_line
                 
                 # Update selection to new position
-                self.selection.set_start(ln - 1, insert_pos)
-                self.selection.set_end(ln - 1, insert_pos + len(selected_text))
+                self.selection.set_range(ln - 1, insert_pos, ln - 1, insert_pos + len(selected_text))
                 self.cursor_line = ln - 1
                 self.cursor_col = insert_pos
                 
-                self.emit("changed")
+                self._mark_changed()
                 return
         
         # No selection - swap entire line
@@ -2429,15 +2294,9 @@ class VirtualBuffer(GObject.Object):
         prev_line = self.get_line(ln - 1)
         
         # Swap lines
-        if ln - 1 in self.inserted_lines:
-            self.inserted_lines[ln - 1] = current_line
-        else:
-            self.edits[ln - 1] = current_line
+        self.overlay[ln - 1] = current_line
         
-        if ln in self.inserted_lines:
-            self.inserted_lines[ln] = prev_line
-        else:
-            self.edits[ln] = prev_line
+        self.overlay[ln] = prev_line
         
         # Move cursor to new line position
         self.cursor_line = ln - 1
@@ -2446,7 +2305,7 @@ class VirtualBuffer(GObject.Object):
         # Clear selection
         self.selection.clear()
         
-        self.emit("changed")
+        self._mark_changed()
     
     def move_line_down_with_text(self):
         """Move current line or selection down one line (Alt+Down)"""
@@ -2478,25 +2337,18 @@ class VirtualBuffer(GObject.Object):
                         selected_lines.append(self.get_line(i))
                     
                     # Put line_below at the start (where first selected line was)
-                    if start_ln in self.inserted_lines:
-                        self.inserted_lines[start_ln] = line_below
-                    else:
-                        self.edits[start_ln] = line_below
+                    self.overlay[start_ln] = line_below
                     
                     # Put all selected lines after line_below
                     for i in range(len(selected_lines)):
-                        if start_ln + 1 + i in self.inserted_lines:
-                            self.inserted_lines[start_ln + 1 + i] = selected_lines[i]
-                        else:
-                            self.edits[start_ln + 1 + i] = selected_lines[i]
+                        self.overlay[start_ln + 1 + i] = selected_lines[i]
                     
                     # Update selection to new position (shifted down by 1)
-                    self.selection.set_start(start_ln + 1, start_col)
-                    self.selection.set_end(end_ln + 1, end_col)
+                    self.selection.set_range(start_ln + 1, start_col, end_ln + 1, end_col)
                     self.cursor_line = start_ln + 1
                     self.cursor_col = start_col
                     
-                    self.emit("changed")
+                    self._mark_changed()
                     return
                 
                 # Single-line selection - move text to next line
@@ -2519,23 +2371,16 @@ class VirtualBuffer(GObject.Object):
                 new_next_line = next_line[:insert_pos] + selected_text + next_line[insert_pos:]
                 
                 # Update both lines
-                if ln in self.inserted_lines:
-                    self.inserted_lines[ln] = new_current_line
-                else:
-                    self.edits[ln] = new_current_line
+                self.overlay[ln] = new_current_line
                 
-                if ln + 1 in self.inserted_lines:
-                    self.inserted_lines[ln + 1] = new_next_line
-                else:
-                    self.edits[ln + 1] = new_next_line
+                self.overlay[ln + 1] = new_next_line
                 
                 # Update selection to new position
-                self.selection.set_start(ln + 1, insert_pos)
-                self.selection.set_end(ln + 1, insert_pos + len(selected_text))
+                self.selection.set_range(ln + 1, insert_pos, ln + 1, insert_pos + len(selected_text))
                 self.cursor_line = ln + 1
                 self.cursor_col = insert_pos
                 
-                self.emit("changed")
+                self._mark_changed()
                 return
         
         # No selection - swap entire line
@@ -2548,15 +2393,9 @@ class VirtualBuffer(GObject.Object):
         next_line = self.get_line(ln + 1)
         
         # Swap lines
-        if ln in self.inserted_lines:
-            self.inserted_lines[ln] = next_line
-        else:
-            self.edits[ln] = next_line
+        self.overlay[ln] = next_line
         
-        if ln + 1 in self.inserted_lines:
-            self.inserted_lines[ln + 1] = current_line
-        else:
-            self.edits[ln + 1] = current_line
+        self.overlay[ln + 1] = current_line
         
         # Move cursor to new line position
         self.cursor_line = ln + 1
@@ -2565,7 +2404,7 @@ class VirtualBuffer(GObject.Object):
         # Clear selection
         self.selection.clear()
         
-        self.emit("changed")
+        self._mark_changed()
 
 
 
@@ -2581,10 +2420,19 @@ class InputController:
         self.dragging = False
         self.drag_start_line = -1
         self.drag_start_col = -1
+        self._last_drag = (-1, -1)  # last (ln, col) applied by update_drag
+        
+        # Column Up/Down aim for, so passing through short lines doesn't
+        # lose it; only honoured while the cursor is still where the last
+        # vertical move left it (goal_pos)
+        self.goal_col = None
+        self.goal_pos = None
 
     def click(self, ln, col):
-        self.buf.set_cursor(ln, col)
-        self.buf.selection.clear()
+        self.goal_col = None
+        b = self.buf
+        b.set_cursor(ln, col)
+        b.selection.clear()
         self.drag_start_line = ln
         self.drag_start_col = col
         self.dragging = False
@@ -2593,18 +2441,19 @@ class InputController:
         self.dragging = True
         self.drag_start_line = ln
         self.drag_start_col = col
+        self._last_drag = (-1, -1)
         
-        # Set cursor first (this clears old selection and sets cursor position)
-        self.buf.set_cursor(ln, col, extend_selection=False)
-        
-        # Now establish the new selection anchor at the current cursor position
-        self.buf.selection.set_start(ln, col)
-        self.buf.selection.set_end(ln, col)
+        # Move the cursor and anchor a fresh, empty selection there
+        self.buf.begin_drag_at(ln, col)
 
     def update_drag(self, ln, col):
+        # Motion events arrive far more often than the pointer crosses a
+        # character cell; repeating the last position changes nothing
+        if (ln, col) == self._last_drag:
+            return
         if self.dragging:
-            self.buf.selection.set_end(ln, col)
-            self.buf.set_cursor(ln, col, extend_selection=True)
+            self._last_drag = (ln, col)
+            self.buf.extend_selection_to(ln, col)
 
     def end_drag(self):
         """End drag selection"""
@@ -2620,31 +2469,23 @@ class InputController:
         if not hasattr(self.view, 'word_wrap') or not self.view.word_wrap:
             return None
             
-        # Create a temporary cairo surface to get layout
-        import cairo
-        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
-        cr = cairo.Context(surface)
-        
-        # Get the text for this line
-        text = self.buf.get_line(ln)
-        if not text:
-            text = " "
-        
-        # Create layout with word wrap settings
-        layout = self.view.renderer.create_text_layout(cr, text)
-        layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+        # Measure on the view's shared off-screen context
+        cr = self.view._im_cr
         
         # Calculate wrap width (same as in draw method)
         alloc = self.view.get_allocation()
         total = self.buf.total()
         ln_width = self.view.renderer.calculate_line_number_width(cr, total)
         wrap_width = max(100, (alloc.width - ln_width - 20) * Pango.SCALE)
-        layout.set_width(wrap_width)
+        
+        # Wrapped layout of this line, as drawn (empty lines lay out " ")
+        line_text = self.buf.get_line(ln)
+        text = line_text if line_text else " "
+        layout, _, _ = self.view.renderer.line_layout(
+            cr, ln, line_text, self.view._hit_layout, wrap_width)
         
         # Convert column to byte index
-        byte_idx = 0
-        for ch in text[:col]:
-            byte_idx += len(ch.encode("utf-8"))
+        byte_idx = column_to_byte(text, col)
         
         # Iterate through visual lines to find which one contains our cursor
         iter = layout.get_iter()
@@ -2670,34 +2511,49 @@ class InputController:
         return (found_line_idx, total_visual_lines, byte_idx)
 
     def move_left(self, extend_selection=False):
+        self.goal_col = None
         b = self.buf
         ln, col = b.cursor_line, b.cursor_col
+        sel = b.selection
+        
+        # Hot path: plain Left inside a line with nothing selected
+        if col > 0 and not sel.active and not extend_selection:
+            b.set_cursor(ln, col - 1, False)
+            return
         
-        if not extend_selection and b.selection.has_selection():
+        # sel.active is checked first so a no-selection press skips the
+        # has_selection() call
+        if not extend_selection and sel.active and sel.has_selection():
             # Move to start of selection
-            start_ln, start_col, _, _ = b.selection.get_bounds()
+            start_ln, start_col = min((sel.start_line, sel.start_col), (sel.end_line, sel.end_col))
             b.set_cursor(start_ln, start_col, extend_selection)
         elif col > 0:
             # Move left within line
             b.set_cursor(ln, col - 1, extend_selection)
         elif ln > 0:
             # At start of line - move to end of previous line (selecting the newline)
-            prev = b.get_line(ln - 1)
-            b.set_cursor(ln - 1, len(prev), extend_selection)
+            b.set_cursor(ln - 1, b.line_len(ln - 1), extend_selection)
 
     def move_right(self, extend_selection=False):
+        self.goal_col = None
         b = self.buf
         ln, col = b.cursor_line, b.cursor_col
-        line = b.get_line(ln)
+        sel = b.selection
+        line_len = b.line_len(ln)
+        
+        # Hot path: plain Right inside a line with nothing selected
+        if col < line_len and not sel.active and not extend_selection:
+            b.set_cursor(ln, col + 1, False)
+            return
         
-        if not extend_selection and b.selection.has_selection():
+        if not extend_selection and sel.active and sel.has_selection():
             # Move to end of selection
-            _, _, end_ln, end_col = b.selection.get_bounds()
+            end_ln, end_col = max((sel.start_line, sel.start_col), (sel.end_line, sel.end_col))
             b.set_cursor(end_ln, end_col, extend_selection)
-        elif col < len(line):
+        elif col < line_len:
             # Move right within line
             b.set_cursor(ln, col + 1, extend_selection)
-        elif ln + 1 < b.total():
+        elif ln < b.last_line_index:
             # At end of line - move to start of next line (selecting the newline)
             b.set_cursor(ln + 1, 0, extend_selection)
 
@@ -2714,26 +2570,20 @@ class InputController:
             # If not on the first visual line of this logical line, move within the same logical line
             if visual_line_idx > 0:
                 # Move to previous visual line within same logical line
-                import cairo
-                surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
-                cr = cairo.Context(surface)
-                
-                text = b.get_line(ln)
-                if not text:
-                    text = " "
-                
-                layout = self.view.renderer.create_text_layout(cr, text)
-                layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+                cr = self.view._im_cr
                 
                 alloc = self.view.get_allocation()
                 total = b.total()
                 ln_width = self.view.renderer.calculate_line_number_width(cr, total)
                 wrap_width = max(100, (alloc.width - ln_width - 20) * Pango.SCALE)
-                layout.set_width(wrap_width)
+                
+                line_text = b.get_line(ln)
+                text = line_text if line_text else " "
+                layout, _, _ = self.view.renderer.line_layout(
+                    cr, ln, line_text, self.view._hit_layout, wrap_width)
                 
                 # Get cursor position to maintain X coordinate
-                strong_pos, _ = layout.get_cursor_pos(byte_idx)
-                target_x = strong_pos.x
+                target_x = self.view.renderer.cursor_x(layout, text, byte_idx)
                 
                 # Find the target visual line (previous one)
                 iter = layout.get_iter()
@@ -2753,44 +2603,13 @@ class InputController:
                 inside, index, trailing = line.x_to_index(target_x)
                 
                 # Convert byte index back to column
-                new_col = 0
-                byte_count = 0
-                for i, ch in enumerate(text):
-                    if byte_count >= index:
-                        new_col = i
-                        break
-                    byte_count += len(ch.encode("utf-8"))
-                else:
-                    new_col = len(text)
+                new_col = byte_to_column(text, index)
                 
                 b.set_cursor(ln, new_col, extend_selection)
                 return
         
         # Default behavior: move to previous logical line
-        if ln > 0:
-            # Can move up to previous line
-            target = ln - 1
-            target_line = b.get_line(target)
-            
-            if extend_selection:
-                # When extending selection upward
-                # Check if target is an empty line
-                if len(target_line) == 0:
-                    # Moving up to an empty line - go to position 0
-                    b.set_cursor(target, 0, extend_selection)
-                else:
-                    # Normal selection - maintain column position if possible
-                    new_col = min(b.cursor_col, len(target_line))
-                    b.set_cursor(target, new_col, extend_selection)
-            else:
-                # Not extending selection - normal movement
-                new_col = min(b.cursor_col, len(target_line))
-                b.set_cursor(target, new_col, extend_selection)
-        else:
-            # Already on first line (line 0), can't move up
-            # If extending selection, select to beginning of current line (like shift+home)
-            if extend_selection:
-                b.set_cursor(0, 0, extend_selection)
+        self._move_to_adjacent_line(-1, extend_selection)
 
     def move_down(self, extend_selection=False):
         b = self.buf
@@ -2805,26 +2624,20 @@ class InputController:
             # If not on the last visual line of this logical line, move within the same logical line
             if visual_line_idx < total_visual_lines - 1:
                 # Move to next visual line within same logical line
-                import cairo
-                surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
-                cr = cairo.Context(surface)
-                
-                text = b.get_line(ln)
-                if not text:
-                    text = " "
-                
-                layout = self.view.renderer.create_text_layout(cr, text)
-                layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+                cr = self.view._im_cr
                 
                 alloc = self.view.get_allocation()
                 total = b.total()
                 ln_width = self.view.renderer.calculate_line_number_width(cr, total)
                 wrap_width = max(100, (alloc.width - ln_width - 20) * Pango.SCALE)
-                layout.set_width(wrap_width)
+                
+                line_text = b.get_line(ln)
+                text = line_text if line_text else " "
+                layout, _, _ = self.view.renderer.line_layout(
+                    cr, ln, line_text, self.view._hit_layout, wrap_width)
                 
                 # Get cursor position to maintain X coordinate
-                strong_pos, _ = layout.get_cursor_pos(byte_idx)
-                target_x = strong_pos.x
+                target_x = self.view.renderer.cursor_x(layout, text, byte_idx)
                 
                 # Find the target visual line (next one)
                 iter = layout.get_iter()
@@ -2844,54 +2657,91 @@ class InputController:
                 inside, index, trailing = line.x_to_index(target_x)
                 
                 # Convert byte index back to column
-                new_col = 0
-                byte_count = 0
-                for i, ch in enumerate(text):
-                    if byte_count >= index:
-                        new_col = i
-                        break
-                    byte_count += len(ch.encode("utf-8"))
-                else:
-                    new_col = len(text)
+                new_col = byte_to_column(text, index)
                 
                 b.set_cursor(ln, new_col, extend_selection)
                 return
         
         # Default behavior: move to next logical line
-        if ln + 1 < b.total():
-            # Can move down to next line
-            target = ln + 1
-            target_line = b.get_line(target)
+        self._move_to_adjacent_line(1, extend_selection)
+
+    def move_vertical(self, delta, extend_selection=False):
+        """Move the cursor delta lines down (negative: up) in one step.
+        
+        Same result as calling move_down/move_up abs(delta) times, but the
+        target line and column are computed directly; used for paging.
+        With word wrap the steps are visual lines, so those are still
+        taken one at a time.
+        """
+        if delta == 0:
+            return
+        d = 1 if delta > 0 else -1
+        if hasattr(self.view, 'word_wrap') and self.view.word_wrap:
+            step = self.move_down if d > 0 else self.move_up
+            for _ in range(abs(delta)):
+                step(extend_selection)
+            return
+        
+        b = self.buf
+        ln = b.cursor_line
+        total = b.total()
+        target = max(0, min(ln + delta, total - 1))
+        
+        if target != ln:
+            col = b.cursor_col
+            if self.goal_col is not None and self.goal_pos == (ln, col):
+                col = self.goal_col
             
+            target_len = b.line_len(target)
+            new_col = min(col, target_len)
+            
+            # The last single step decides the empty-line rule of
+            # _move_to_adjacent_line; the cursor sits at column 0 on any
+            # empty line it passed through
+            source = target - d
+            if (d > 0 and extend_selection and b.line_len(source) == 0
+                    and (source != ln or b.cursor_col == 0)):
+                new_col = target_len if target == total - 1 else 0
+            
+            b.set_cursor(target, new_col, extend_selection)
+            self.goal_col = col
+            self.goal_pos = (b.cursor_line, b.cursor_col)
+        
+        if abs(target - ln) < abs(delta) and extend_selection:
+            # Ran into the first/last line: select to its start/end
+            self.goal_col = None
+            b.set_cursor(target, 0 if d < 0 else b.line_len(target), extend_selection)
+
+    def _move_to_adjacent_line(self, d, extend_selection):
+        """Step the cursor one logical line up (d=-1) or down (d=1), keeping its column"""
+        b = self.buf
+        ln = b.cursor_line
+        target = ln + d
+        total = b.total()
+        
+        if target < 0 or target >= total:
+            # Already on the first/last line, can't move; when extending,
+            # select to the start/end of the current line (like shift+home/end)
             if extend_selection:
-                # When extending selection downward
-                current_line = b.get_line(ln)
-                
-                # Check if target is the last line (no newline after it)
-                is_last_line = (target == b.total() - 1)
-                
-                # Special case: at column 0 of empty line
-                if len(current_line) == 0 and b.cursor_col == 0:
-                    if is_last_line:
-                        # Empty line followed by last line - select to end of last line
-                        b.set_cursor(target, len(target_line), extend_selection)
-                    else:
-                        # Empty line with more lines after - select just the newline
-                        b.set_cursor(target, 0, extend_selection)
-                else:
-                    # Normal selection - maintain column position
-                    new_col = min(b.cursor_col, len(target_line))
-                    b.set_cursor(target, new_col, extend_selection)
-            else:
-                # Not extending selection - normal movement
-                new_col = min(b.cursor_col, len(target_line))
-                b.set_cursor(target, new_col, extend_selection)
-        else:
-            # Already on last line, can't move down
-            # If extending selection, select to end of current line (like shift+end)
-            if extend_selection:
-                current_line = b.get_line(ln)
-                b.set_cursor(ln, len(current_line), extend_selection)
+                self.goal_col = None
+                b.set_cursor(ln, 0 if d < 0 else b.line_len(ln), extend_selection)
+            return
+        
+        col = b.cursor_col
+        if self.goal_col is not None and self.goal_pos == (ln, col):
+            col = self.goal_col
+        
+        target_len = b.line_len(target)
+        new_col = min(col, target_len)
+        
+        # Shift+Down from column 0 of an empty line selects just its newline,
+        # or runs to the end of the last line when nothing follows it
+        if d > 0 and extend_selection and b.cursor_col == 0 and b.line_len(ln) == 0:
+            new_col = target_len if target == total - 1 else 0
+        
+        b.set_cursor(target, new_col, extend_selection)
+        self.goal_col = col
+        self.goal_pos = (b.cursor_line, b.cursor_col)
 
     def move_word_left(self, extend_selection=False):
         """Move cursor to the start of the previous word"""
@@ -2899,14 +2749,6 @@ class InputController:
         ln, col = b.cursor_line, b.cursor_col
         line = b.get_line(ln)
         
-        # Helper to check if character is a word character
-        import unicodedata
-        def is_word_char(ch):
-            if ch == '_':
-                return True
-            cat = unicodedata.category(ch)
-            return cat[0] in ('L', 'N', 'M')
-        
         # If at start of line, go to end of previous line
         if col == 0:
             if ln > 0:
@@ -2914,55 +2756,30 @@ class InputController:
                 b.set_cursor(ln - 1, len(prev_line), extend_selection)
             return
         
-        # Skip whitespace to the left
-        while col > 0 and line[col - 1].isspace():
-            col -= 1
-        
-        if col == 0:
-            b.set_cursor(ln, col, extend_selection)
-            return
-        
-        # Now we're on a non-whitespace character
-        # Check what type it is and skip that type
-        if is_word_char(line[col - 1]):
-            # Skip word characters to the left
-            while col > 0 and is_word_char(line[col - 1]):
-                col -= 1
-        else:
-            # Skip symbols/punctuation to the left (treat as a "word")
-            while col > 0 and not line[col - 1].isspace() and not is_word_char(line[col - 1]):
-                col -= 1
-        
-        b.set_cursor(ln, col, extend_selection)
+        b.set_cursor(ln, word_left(line, col), extend_selection)
     
     def move_word_right(self, extend_selection=False):
         """Move cursor to the start of the next word"""
         b = self.buf
+        sel = b.selection
         ln, col = b.cursor_line, b.cursor_col
         line = b.get_line(ln)
         
-        # Helper to check if character is a word character
-        import unicodedata
-        def is_word_char(ch):
-            if ch == '_':
-                return True
-            cat = unicodedata.category(ch)
-            return cat[0] in ('L', 'N', 'M')
-        
         # If at end of line, go to start of next line
         if col >= len(line):
             if ln + 1 < b.total():
                 b.set_cursor(ln + 1, 0, extend_selection)
             return
         
+        tags = char_classes(line)
+        
         # Special handling when cursor is on space with no selection
-        if line[col].isspace() and not b.selection.has_selection():
+        if tags[col] == 's' and not sel.has_selection():
             # Select space(s) + next word
             start_col = col
             
             # Skip whitespace on current line
-            while col < len(line) and line[col].isspace():
-                col += 1
+            col = skip_class_right(tags, col, 's')
             
             # If we reached end of line
             if col >= len(line):
@@ -2970,85 +2787,62 @@ class InputController:
                 if ln + 1 < b.total():
                     # Select space(s) + newline + next word from next line
                     next_line = b.get_line(ln + 1)
-                    next_col = 0
+                    next_tags = char_classes(next_line)
                     
                     # Skip leading whitespace on next line
-                    while next_col < len(next_line) and next_line[next_col].isspace():
-                        next_col += 1
+                    next_col = skip_class_right(next_tags, 0, 's')
                     
                     # Select the next word on next line
                     if next_col < len(next_line):
-                        if is_word_char(next_line[next_col]):
-                            while next_col < len(next_line) and is_word_char(next_line[next_col]):
-                                next_col += 1
-                        elif not next_line[next_col].isspace():
-                            while next_col < len(next_line) and not next_line[next_col].isspace() and not is_word_char(next_line[next_col]):
-                                next_col += 1
+                        next_col = skip_class_right(next_tags, next_col, next_tags[next_col])
                     
                     # Set selection from start_col on current line to next_col on next line
-                    b.selection.set_start(ln, start_col)
-                    b.selection.set_end(ln + 1, next_col)
+                    sel.set_range(ln, start_col, ln + 1, next_col)
                     b.cursor_line = ln + 1
                     b.cursor_col = next_col
                     return
                 else:
                     # No next line - select spaces to end of line
-                    b.selection.set_start(ln, start_col)
-                    b.selection.set_end(ln, col)
+                    sel.set_range(ln, start_col, ln, col)
                     b.cursor_col = col
                     return
             
             # We found a non-space character - select the word
-            if is_word_char(line[col]):
-                while col < len(line) and is_word_char(line[col]):
-                    col += 1
-            elif not line[col].isspace():
-                while col < len(line) and not line[col].isspace() and not is_word_char(line[col]):
-                    col += 1
+            col = skip_class_right(tags, col, tags[col])
             
             # Set selection from start_col to col
-            b.selection.set_start(ln, start_col)
-            b.selection.set_end(ln, col)
+            sel.set_range(ln, start_col, ln, col)
             b.cursor_col = col
             return
         
-        # Check what type of character we're on and skip that type
-        if is_word_char(line[col]):
-            # Skip word characters to the right
-            while col < len(line) and is_word_char(line[col]):
-                col += 1
-        elif not line[col].isspace():
-            # Skip symbols/punctuation to the right (treat as a "word")
-            while col < len(line) and not line[col].isspace() and not is_word_char(line[col]):
-                col += 1
+        # Skip the run of word characters, or of symbols/punctuation
+        # (treated as a "word"), under the cursor
+        if tags[col] != 's':
+            col = skip_class_right(tags, col, tags[col])
         
         # If extending an existing selection, skip whitespace AND select next word
         # This makes second Ctrl+Shift+Right select space + next word
-        if extend_selection and b.selection.has_selection():
+        if extend_selection and sel.has_selection():
             # Skip whitespace
-            while col < len(line) and line[col].isspace():
-                col += 1
+            col = skip_class_right(tags, col, 's')
             
             # Now select the next word
             if col < len(line):
-                if is_word_char(line[col]):
-                    while col < len(line) and is_word_char(line[col]):
-                        col += 1
-                elif not line[col].isspace():
-                    while col < len(line) and not line[col].isspace() and not is_word_char(line[col]):
-                        col += 1
+                col = skip_class_right(tags, col, tags[col])
         
         b.set_cursor(ln, col, extend_selection)
+    
     def move_home(self, extend_selection=False):
         """Move to beginning of line"""
+        self.goal_col = None
         b = self.buf
         b.set_cursor(b.cursor_line, 0, extend_selection)
 
     def move_end(self, extend_selection=False):
         """Move to end of line"""
+        self.goal_col = None
         b = self.buf
-        line = b.get_line(b.cursor_line)
-        b.set_cursor(b.cursor_line, len(line), extend_selection)
+        b.set_cursor(b.cursor_line, b.line_len(b.cursor_line), extend_selection)
 
     def move_document_start(self, extend_selection=False):
         """Move to beginning of document"""
@@ -3057,10 +2851,8 @@ class InputController:
     def move_document_end(self, extend_selection=False):
         """Move to end of document"""
         b = self.buf
-        total = b.total()
-        last_line = total - 1
-        last_line_text = b.get_line(last_line)
-        b.set_cursor(last_line, len(last_line_text), extend_selection)
+        last_line = b.last_line_index
+        b.set_cursor(last_line, b.line_len(last_line), extend_selection)
 
 
 # ============================================================
@@ -3068,26 +2860,43 @@ class InputController:
 # ============================================================
 
 class Renderer:
-    def __init__(self):
-        self.font = Pango.FontDescription("Monospace 12")
-
-        # Correct GTK4/Pango method to compute line height:
-        # Use logical extents, not ink extents.
-        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
-        cr = cairo.Context(surface)
+    # Font description string → (text_h, mono_adv), shared by all renderers
+    _font_metrics = {}
 
-        layout = PangoCairo.create_layout(cr)
-        layout.set_font_description(self.font)
-        layout.set_text("Ag", -1)  # Reliable glyph pair for height
+    # Most line layouts kept across frames (see _line_layouts)
+    LINE_LAYOUT_CACHE_SIZE = 1024
 
-        ink_rect, logical_rect = layout.get_pixel_extents()
+    def __init__(self):
+        self.font = Pango.FontDescription("Monospace 12")
 
         # These are the correct text and line heights
-        self.text_h = logical_rect.height
+        self.text_h, self._mono_adv = self.font_metrics(self.font)
         self.line_h = self.text_h
 
         # Track maximum line width for horizontal scrollbar
         self.max_line_width = 0
+
+        # Text layouts of recently drawn lines, least recently drawn first:
+        # ln → (text, wrap width or -1, layout, text_w, is_rtl).
+        # An entry is reused only while the line's text and wrap width are
+        # unchanged, so edits need no explicit invalidation.
+        self._line_layouts = {}
+
+        # Layout shared by all empty lines: (wrap width or -1, layout, text_w)
+        self._blank_layout = None
+
+        # Line number layout, kept across frames (LTR always)
+        self._num_layout = None
+
+        # Reusable layout for one-off measurements (see get_scratch_layout)
+        self._scratch_layout = None
+        self._scratch_cr = None
+
+        # Recorded text layer of the last frame: (key, cairo pattern, row_ys)
+        self._text_layer = None
+
+        # Line number column width by digit count (font is fixed)
+        self._ln_width_cache = {}
         self.needs_full_width_scan = False  # Flag to scan all lines after file load</        
         # Colors
         self.editor_background_color = (0.10, 0.10, 0.10)
@@ -3096,6 +2905,39 @@ class Renderer:
         self.selection_background_color = (0.2, 0.4, 0.6)
         self.selection_foreground_color = (1.0, 1.0, 1.0)
 
+    @classmethod
+    def font_metrics(cls, font):
+        """Return (text height in px, monospace advance or None) for font.
+        
+        The advance is in Pango units and is only given when all printable
+        ASCII glyphs share it. Probed once per font and cached.
+        """
+        key = font.to_string()
+        metrics = cls._font_metrics.get(key)
+        if metrics is not None:
+            return metrics
+
+        # Correct GTK4/Pango method to compute line height:
+        # Use logical extents, not ink extents.
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
+        cr = cairo.Context(surface)
+
+        layout = PangoCairo.create_layout(cr)
+        layout.set_font_description(font)
+        layout.set_text("Ag", -1)  # Reliable glyph pair for height
+
+        ink_rect, logical_rect = layout.get_pixel_extents()
+        text_h = logical_rect.height
+
+        layout.set_text("i" * 10, -1)
+        narrow = layout.get_extents()[1].width
+        layout.set_text("M" * 10, -1)
+        wide = layout.get_extents()[1].width
+        mono_adv = wide / 10 if wide == narrow else None
+
+        metrics = cls._font_metrics[key] = (text_h, mono_adv)
+        return metrics
+
     def create_text_layout(self, cr, text="", auto_dir=True):
         """Create a Pango layout with standard settings.
         
@@ -3115,41 +2957,130 @@ class Renderer:
             layout.set_text(text, -1)
         return layout
 
-    def calculate_max_line_width(self, cr, buf):
-        """Calculate the maximum line width across all lines in the buffer"""
-        if not buf:
-            self.max_line_width = 0
-            return
+    def get_scratch_layout(self, cr, text, wrap_width=-1):
+        """Return the shared scratch layout set to text and wrap_width.
         
-        layout = PangoCairo.create_layout(cr)
-        layout.set_font_description(self.font)
-        layout.set_auto_dir(True)
+        The layout is recreated only when the Cairo context changes, so it
+        is valid until the next call; never keep it across calls.
+        """
+        layout = self._scratch_layout
+        if layout is None or cr is not self._scratch_cr:
+            layout = self.create_text_layout(cr)
+            layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+            self._scratch_layout = layout
+            self._scratch_cr = cr
+        layout.set_text(text, -1)
+        layout.set_width(wrap_width)
+        return layout
+
+    def blank_layout(self, cr, wrap_width=-1):
+        """Return (layout, text_w) for an empty line.
         
-        max_width = 0
-        total = buf.total()
+        Empty lines are drawn as a single space, which is shaped once per
+        wrap width and shared, as nothing is shown from it.
+        """
+        entry = self._blank_layout
+        if entry is None or entry[0] != wrap_width:
+            layout = self.create_text_layout(cr, " ")
+            layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+            layout.set_width(wrap_width)
+            entry = (wrap_width, layout, layout.get_pixel_extents()[1].width)
+            self._blank_layout = entry
+        else:
+            PangoCairo.update_layout(cr, entry[1])
+        return entry[1], entry[2]
+
+    # Correct UTF-8 byte-index for logical col → Pango visual mapping
+    def visual_byte_index(self, text, col):
+        return column_to_byte(text, col)
+
+    def line_layout(self, cr, ln, text, layout=None, wrap_width=-1):
+        """Return (layout, text_w, is_rtl) for line ln showing text.
+        
+        Reuses the layout last drawn for ln when its text and wrap width
+        (-1: unwrapped) are unchanged, so IM cursor placement and hit
+        testing do not reshape visible lines. Otherwise the caller's own
+        layout is reset to text, if given, or a new one is created on cr.
+        """
+        entry = self._line_layouts.get(ln)
+        if entry is not None and entry[0] == text and entry[1] == wrap_width:
+            return entry[2], entry[3], entry[4]
+        if layout is None:
+            layout = self.create_text_layout(cr, text if text else " ")
+        else:
+            layout.set_font_description(self.font)
+            layout.set_text(text if text else " ", -1)
+        layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+        layout.set_width(wrap_width)
+        text_w, _ = layout.get_pixel_size()
+        return layout, text_w, detect_rtl_line(text)
+
+    def cursor_pos(self, layout, text, byte_index):
+        """Strong cursor rectangle (Pango units) at byte_index.
+        
+        ASCII text has no bidi runs, so the leading edge of the character
+        rectangle from index_to_pos() is the same point, without Pango
+        also computing the weak cursor.
+        """
+        if text.isascii():
+            return layout.index_to_pos(byte_index)
+        strong_pos, _ = layout.get_cursor_pos(byte_index)
+        return strong_pos
+
+    def cursor_x(self, layout, text, byte_index):
+        """X offset (Pango units) of the strong cursor at byte_index."""
+        return self.cursor_pos(layout, text, byte_index).x
+
+    def calculate_max_line_width(self, cr, buf):
+        """Calculate the maximum line width across all lines in the buffer"""
+        if not buf:
+            self.max_line_width = 0
+            return
+        
+        layout = PangoCairo.create_layout(cr)
+        layout.set_font_description(self.font)
+        layout.set_auto_dir(True)
+        
+        max_width = 0
+        total = buf.total()
         ln_width = self.calculate_line_number_width(cr, total)
         
         # Check all lines
         for ln in range(total):
             text = buf.get_line(ln)
             if text:
-                layout.set_text(text, -1)
-                ink, logical = layout.get_pixel_extents()
-                text_w = logical.width
+                text_w = self.measure_line_width(layout, text)
                 line_total_width = ln_width + text_w
                 if line_total_width > max_width:
                     max_width = line_total_width
         
         self.max_line_width = max_width
     
+    def cursor_alpha(self, phase):
+        """Cursor alpha for blink phase 0 → 2; saturates at 1.0 from phase 1"""
+        return min(1.0, 0.3 + 0.7 * phase)
+
+    def mono_width(self, ncols):
+        """Pixel width of ncols printable ASCII columns in the monospace font"""
+        return int(ncols * self._mono_adv / Pango.SCALE + 0.5)
+
+    def measure_line_width(self, layout, text):
+        """Logical pixel width of one line of text.
+
+        Printable ASCII in a monospace font is just len × advance; anything
+        else is shaped with the given layout.
+        """
+        if self._mono_adv is not None and text.isascii() and text.isprintable():
+            return self.mono_width(len(text))
+        layout.set_text(text, -1)
+        ink, logical = layout.get_pixel_extents()
+        return logical.width
+
     def get_text_width(self, cr, text):
         """Calculate actual pixel width of text using Pango"""
         if not text:
             return 0
-        layout = PangoCairo.create_layout(cr)
-        layout.set_font_description(self.font)
-        layout.set_text(text, -1)
-        width, _ = layout.get_pixel_size()
+        width, _ = self.get_scratch_layout(cr, text).get_pixel_size()
         return width
 
     def calculate_text_base_x(self, is_rtl, text_w, view_w, ln_width, scroll_x):
@@ -3174,21 +3105,25 @@ class Renderer:
 
     def calculate_line_number_width(self, cr, total_lines):
         """Calculate width needed for line numbers based on total lines"""
-        # Format the largest line number
-        max_line_num = str(total_lines)
-        width = self.get_text_width(cr, max_line_num)
-        return width + 15  # Add padding (5px left + 10px right margin)
+        # Only the digit count of the largest line number matters
+        digits = len(str(total_lines))
+        width = self._ln_width_cache.get(digits)
+        if width is None:
+            if self._mono_adv is not None:
+                width = self.mono_width(digits)
+            else:
+                width = self.get_text_width(cr, "9" * digits)
+            width += 15  # Add padding (5px left + 10px right margin)
+            self._ln_width_cache[digits] = width
+        return width
 
     def draw(self, cr, alloc, buf, scroll_line, scroll_x,
             cursor_visible=True, cursor_phase=0.0):
 
-        import math
-        import unicodedata
-        
         # If we need a full width scan (e.g., after loading a file), do it first
         if self.needs_full_width_scan and buf:
             self.needs_full_width_scan = False
-            layout = self.create_text_layout(cr)
+            layout = self.get_scratch_layout(cr, "")
             
             total = buf.total()
             ln_width = self.calculate_line_number_width(cr, total)
@@ -3199,57 +3134,47 @@ class Renderer:
             for ln in range(scan_limit):
                 text = buf.get_line(ln)
                 if text:
-                    layout.set_text(text, -1)
-                    ink, logical = layout.get_pixel_extents()
-                    text_w = logical.width
+                    text_w = self.measure_line_width(layout, text)
                     line_total_width = ln_width + text_w
                     if line_total_width > max_width:
                         max_width = line_total_width
             
             self.max_line_width = max_width
 
-        # Base-direction detection
-        def line_is_rtl(text):
-            for ch in text:
-                t = unicodedata.bidirectional(ch)
-                if t in ("L", "LRE", "LRO"):
-                    return False
-                if t in ("R", "AL", "RLE", "RLO"):
-                    return True
-            return False
-
-        # Visual UTF-8 byte index for Pango (cluster-correct)
-        def visual_byte_index(text, col):
-            b = 0
-            for ch in text[:col]:
-                b += len(ch.encode("utf-8"))
-            return b
+        visual_byte_index = self.visual_byte_index
 
         # Background
         cr.set_source_rgb(*self.editor_background_color)
         cr.paint()
 
-        layout = PangoCairo.create_layout(cr)
-        layout.set_font_description(self.font)
+        # Shared layout for line numbers (LTR always)
+        num_layout = self._num_layout
+        if num_layout is None:
+            num_layout = PangoCairo.create_layout(cr)
+            num_layout.set_font_description(self.font)
+            num_layout.set_auto_dir(False)
+            self._num_layout = num_layout
+        else:
+            PangoCairo.update_layout(cr, num_layout)
         
         # Enable word wrap if requested (passed via view parameter)
         # Note: word_wrap parameter should be added to method signature
+        # buf._view is a weak reference to the owning view (None if gone)
+        view = buf._view() if hasattr(buf, '_view') else None
         word_wrap_enabled = False
-        if hasattr(buf, '_view') and hasattr(buf._view, 'word_wrap'):
-            word_wrap_enabled = buf._view.word_wrap
+        if hasattr(view, 'word_wrap'):
+            word_wrap_enabled = view.word_wrap
+        
+        total = buf.total()
+        ln_width = self.calculate_line_number_width(cr, total)
         
         if word_wrap_enabled:
-            # Set wrap mode and width for word wrapping
-            layout.set_wrap(Pango.WrapMode.WORD_CHAR)
-            # Set width to viewport width minus line number area
-            total = buf.total() if buf else 1
-            ln_width = self.calculate_line_number_width(cr, total)
+            # Wrap width for line layouts: viewport width minus line number area
             wrap_width = max(100, (alloc.width - ln_width - 20) * Pango.SCALE)  # 20px margin
-            layout.set_width(wrap_width)
-        layout.set_auto_dir(True)
+            wrap_key = wrap_width
+        else:
+            wrap_key = -1
 
-        total = buf.total()
-        ln_width = self.calculate_line_number_width(cr, total)
         max_vis = (alloc.height // self.line_h) + 1
 
         # Get selection bounds if any
@@ -3262,42 +3187,110 @@ class Renderer:
         # ============================================================
         # DRAW TEXT + LINE NUMBERS + SELECTION
         # ============================================================
-        y = 0
+        first_ln = scroll_line
+        last_ln = min(scroll_line + max_vis, total)
+        if not word_wrap_enabled:
+            # Skip lines wholly outside the clip. GTK4 always clips the
+            # view's draw func to its whole allocation, so this only trims
+            # for callers that clip cr themselves. Wrapped lines have
+            # variable heights and are always laid out from the top
+            _, clip_y1, _, clip_y2 = cr.clip_extents()
+            first_ln = max(first_ln, scroll_line + int(clip_y1) // self.line_h)
+            last_ln = min(last_ln, scroll_line + int(clip_y2) // self.line_h + 1)
+        y = (first_ln - scroll_line) * self.line_h
         max_width_seen = self.max_line_width  # Start with existing max, don't reset
-        
-        for ln in range(scroll_line, min(scroll_line + max_vis, total)):
-            text = buf.get_line(ln)
-
-            # Line number (LTR always, RIGHT ALIGNED)
-            layout.set_auto_dir(False)
-            line_num_str = str(ln + 1)
-            layout.set_text(line_num_str, -1)
-            
-            # Get the width of this line number
-            line_num_width, _ = layout.get_pixel_size()
-            
-            # Right align: position at (ln_width - line_num_width - right_padding)
-            line_num_x = ln_width - line_num_width - 10  # 10px right padding
-            
-            cr.set_source_rgb(*self.linenumber_foreground_color)
-            cr.move_to(line_num_x, y)
-            PangoCairo.show_layout(cr, layout)
-
-            # Prepare for line text
-            is_rtl = line_is_rtl(text)
-            layout.set_auto_dir(True)
-            
-            # Apply word wrap settings for this line if enabled
-            if word_wrap_enabled:
-                layout.set_wrap(Pango.WrapMode.WORD_CHAR)
-                layout.set_width(wrap_width)
+        line_layouts = self._line_layouts
+        drawn_layouts = {}
+        
+        # Line numbers, selection and text depend only on what is keyed
+        # here. Cursor blinks redraw an otherwise identical frame, so they
+        # replay the recorded layer and only the overlays below are redrawn.
+        visible_texts = [buf.get_line(ln) for ln in range(first_ln, last_ln)]
+        layer_key = (tuple(visible_texts), first_ln, scroll_line, scroll_x,
+                     alloc.width, alloc.height, wrap_key, ln_width,
+                     cr.clip_extents(),
+                     (sel_start_line, sel_start_col, sel_end_line, sel_end_col))
+        # Unwrapped lines of printable ASCII far wider than the view (long log
+        # lines) are shaped only around the visible columns when monospace
+        if self._mono_adv is not None and not word_wrap_enabled:
+            window_cols = 2 * (int(alloc.width * Pango.SCALE / self._mono_adv) + 8)
+        else:
+            window_cols = None
+
+        def windowed_line(text):
+            # Such lines get no cached layout; callers place columns by
+            # arithmetic instead of shaping the whole line
+            return (window_cols is not None and len(text) > window_cols
+                    and text.isascii() and text.isprintable())
+        
+        layer = self._text_layer
+        if layer is not None and layer[0] == layer_key:
+            visible_texts = ()
+            drawn_layouts = line_layouts
+        else:
+            layer = None
+            cr.push_group()
+        
+        # One clip for the whole text area keeps text and selection off the
+        # line numbers; the numbers are drawn after it is lifted
+        cr.save()
+        cr.rectangle(ln_width, 0, alloc.width - ln_width, alloc.height)
+        cr.clip()
+        row_ys = []
+        
+        # Middle LTR lines of a multi-line selection are selected across the
+        # whole text area; fill each run of them with one rectangle up front
+        if visible_texts and has_selection and not word_wrap_enabled:
+            lo = max(first_ln, sel_start_line + 1)
+            hi = min(last_ln, sel_end_line)
+            run_start = None
+            for ln in range(lo, hi + 1):
+                if ln < hi and not detect_rtl_line(visible_texts[ln - first_ln]):
+                    if run_start is None:
+                        run_start = ln
+                elif run_start is not None:
+                    cr.rectangle(ln_width, (run_start - scroll_line) * self.line_h,
+                                 alloc.width - ln_width, (ln - run_start) * self.line_h)
+                    run_start = None
+            cr.set_source_rgba(*self.selection_background_color, 0.7)
+            cr.fill()
+        
+        for ln, text in enumerate(visible_texts, first_ln):
+            row_ys.append(y)
+
+            # Prepare for line text: scrolling and cursor blinks redraw
+            # unchanged lines, so reuse last frame's shaped layout for them
+            cached = line_layouts.get(ln)
+            windowed = False
+            if cached is not None and cached[0] == text and cached[1] == wrap_key:
+                _, _, layout, text_w, is_rtl = cached
+                PangoCairo.update_layout(cr, layout)
+            elif windowed_line(text):
+                # Columns map straight to pixels here, so shape just a slice
+                # starting a few columns left of the view; not cached, as the
+                # slice follows scroll_x
+                windowed = True
+                win_start = max(0, int(scroll_x * Pango.SCALE / self._mono_adv) - 4)
+                layout = self.get_scratch_layout(cr, text[win_start:win_start + window_cols])
+                is_rtl = False
+                text_w = self.mono_width(len(text))
+            elif not text:
+                # Nothing is shown for empty lines; skip shaping them
+                layout, text_w = self.blank_layout(cr, wrap_key)
+                is_rtl = False
             else:
-                layout.set_width(-1)  # No wrap
-            
-            layout.set_text(text if text else " ", -1)  # Use space for empty lines
-
-            ink, logical = layout.get_pixel_extents()
-            text_w = logical.width
+                layout = self.create_text_layout(cr, text)
+                
+                # Apply word wrap settings for this line if enabled
+                if word_wrap_enabled:
+                    layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+                    layout.set_width(wrap_width)
+                
+                is_rtl = detect_rtl_line(text)
+                ink, logical = layout.get_pixel_extents()
+                text_w = logical.width
+            if not windowed:
+                drawn_layouts[ln] = (text, wrap_key, layout, text_w, is_rtl)
             
             # Track maximum width for horizontal scrollbar
             line_total_width = ln_width + text_w
@@ -3311,17 +3304,6 @@ class Renderer:
             else:
                 base_x = self.calculate_text_base_x(is_rtl, text_w, alloc.width, ln_width, scroll_x)
             
-            # Set clipping region to prevent text from overlapping line numbers
-            cr.save()
-            # Use actual layout height for clipping if word wrap is enabled
-            if word_wrap_enabled:
-                _, layout_height = layout.get_pixel_size()
-                clip_height = max(self.line_h, layout_height)
-            else:
-                clip_height = self.line_h
-            cr.rectangle(ln_width, y, alloc.width - ln_width, clip_height)
-            cr.clip()
-
             # Draw selection background for this line if needed
             # Draw selection background for this line if needed
             # Draw selection background for this line if needed
@@ -3436,6 +3418,11 @@ class Renderer:
                             if is_last_line:
                                 break
                 
+                elif sel_start_line < ln < sel_end_line and not is_rtl:
+                    # Middle LTR line: text and newline indicator together
+                    # span everything right of the gutter, filled before the loop
+                    pass
+                
                 else:
                     # Calculate selection range for this line
                     if ln == sel_start_line and ln == sel_end_line:
@@ -3456,26 +3443,30 @@ class Renderer:
                         end_col = len(text) + 1  # +1 to include newline visual
                     
                     # Calculate pixel positions for selection
-                    if text or start_col == 0:
+                    if windowed:
+                        sel_start_x = base_x + self.mono_width(min(start_col, len(text)))
+                        text_end_x = base_x + self.mono_width(len(text))
+                        if end_col <= len(text):
+                            sel_end_x = base_x + self.mono_width(end_col)
+                        else:
+                            sel_end_x = text_end_x
+                    elif text or start_col == 0:
                         # Get start position
                         if start_col <= len(text):
                             start_byte = visual_byte_index(text, min(start_col, len(text)))
-                            strong_pos, _ = layout.get_cursor_pos(start_byte)
-                            sel_start_x = base_x + (strong_pos.x // Pango.SCALE)
+                            sel_start_x = base_x + (self.cursor_x(layout, text, start_byte) // Pango.SCALE)
                         else:
                             sel_start_x = base_x
                         
                         # Get end position
                         if end_col <= len(text):
                             end_byte = visual_byte_index(text, end_col)
-                            strong_pos, _ = layout.get_cursor_pos(end_byte)
-                            sel_end_x = base_x + (strong_pos.x // Pango.SCALE)
+                            sel_end_x = base_x + (self.cursor_x(layout, text, end_byte) // Pango.SCALE)
                         else:
                             # Include newline indicator - extend to viewport end
                             if text:
                                 end_byte = visual_byte_index(text, len(text))
-                                strong_pos, _ = layout.get_cursor_pos(end_byte)
-                                sel_end_x = base_x + (strong_pos.x // Pango.SCALE)
+                                sel_end_x = base_x + (self.cursor_x(layout, text, end_byte) // Pango.SCALE)
                             else:
                                 sel_end_x = base_x
                             
@@ -3547,13 +3538,13 @@ class Renderer:
             # Draw line text
             if text:  # Only draw if there's actual text
                 cr.set_source_rgb(*self.text_foreground_color)
-                cr.move_to(base_x, y)
+                if windowed:
+                    cr.move_to(base_x + self.mono_width(win_start), y)
+                else:
+                    cr.move_to(base_x, y)
                 # Text is already set above with wrap settings, just draw it
                 PangoCairo.show_layout(cr, layout)
             
-            # Restore clipping region
-            cr.restore()
-            
             # Increment y position - use actual layout height if word wrapped
             if word_wrap_enabled:
                 # Get the actual height of this (possibly wrapped) line
@@ -3562,32 +3553,86 @@ class Renderer:
             else:
                 y += self.line_h
 
+        cr.restore()
+        
+        # Line numbers (LTR always, RIGHT ALIGNED)
+        cr.set_source_rgb(*self.linenumber_foreground_color)
+        for ln, y in enumerate(row_ys, first_ln):
+            line_num_str = str(ln + 1)
+            num_layout.set_text(line_num_str, -1)
+            
+            # Get the width of this line number (arithmetic for monospace digits)
+            line_num_width = self.measure_line_width(num_layout, line_num_str)
+            
+            # Right align: position at (ln_width - line_num_width - right_padding)
+            line_num_x = ln_width - line_num_width - 10  # 10px right padding
+            
+            cr.move_to(line_num_x, y)
+            PangoCairo.show_layout(cr, num_layout)
+
+        if layer is None:
+            layer = self._text_layer = (layer_key, cr.pop_group(), row_ys)
+        cr.set_source(layer[1])
+        cr.paint()
+        # Row tops of the lines in the layer, for the overlays below
+        row_ys = layer[2]
+        
         # Update tracked maximum line width for horizontal scrollbar
         self.max_line_width = max_width_seen
         
+        # Keep this frame's layouts for the next ones, so scrolling back
+        # to recently drawn lines does not reshape them either
+        if drawn_layouts is not line_layouts:
+            for ln in drawn_layouts:
+                line_layouts.pop(ln, None)
+            line_layouts.update(drawn_layouts)
+            excess = len(line_layouts) - self.LINE_LAYOUT_CACHE_SIZE
+            if excess > 0:
+                for ln in list(islice(line_layouts, excess)):
+                    del line_layouts[ln]
+        
         # ============================================================
         # PREEDIT (IME)
         # ============================================================
         cl, cc = buf.cursor_line, buf.cursor_col
         line_visible = (scroll_line <= cl < scroll_line + max_vis)
+        
+        # Shared by the preedit, cursor and drop passes below
+        if line_visible:
+            cursor_line_text = buf.get_line(cl)
+            cursor_y = (cl - scroll_line) * self.line_h  # unwrapped rows only
+        else:
+            cursor_line_text = None
+            cursor_y = -1
 
         if hasattr(buf, "preedit_string") and buf.preedit_string and line_visible:
-            py = (cl - scroll_line) * self.line_h
-            line_text = buf.get_line(cl)
-
-            pe_l = self.create_text_layout(cr, line_text if line_text else " ")
-
-            is_rtl = detect_rtl_line(line_text)
-            text_w, _ = pe_l.get_pixel_size()
+            py = cursor_y
+            line_text = cursor_line_text
+
+            # Reuse the unwrapped cursor line's layout from the text pass
+            cached = None if word_wrap_enabled else drawn_layouts.get(cl)
+            if cached is not None and cached[0] == line_text and cached[1] == wrap_key:
+                _, _, pe_l, text_w, is_rtl = cached
+            elif windowed_line(line_text):
+                pe_l = None
+                is_rtl = False
+                text_w = self.mono_width(len(line_text))
+            else:
+                pe_l = self.get_scratch_layout(cr, line_text if line_text else " ")
+                is_rtl = detect_rtl_line(line_text)
+                text_w, _ = pe_l.get_pixel_size()
             base_x = self.calculate_text_base_x(is_rtl, text_w, alloc.width, ln_width, scroll_x)
 
-            byte_index = visual_byte_index(line_text, cc)
-            strong_pos, weak_pos = pe_l.get_cursor_pos(byte_index)
-            cursor_x = strong_pos.x // Pango.SCALE
+            if pe_l is None:
+                cursor_x = self.mono_width(min(cc, len(line_text)))
+            else:
+                byte_index = visual_byte_index(line_text, cc)
+                cursor_x = self.cursor_x(pe_l, line_text, byte_index) // Pango.SCALE
             px = base_x + cursor_x
 
-            # Preedit text
-            pe_l.set_text(buf.preedit_string, -1)
+            # Preedit text (in the scratch layout: pe_l may be the cached
+            # line layout, which must keep the line's text)
+            pe_l = self.get_scratch_layout(cr, buf.preedit_string)
             cr.set_source_rgba(1, 1, 1, 0.7)
             cr.move_to(px, py)
             PangoCairo.show_layout(cr, pe_l)
@@ -3602,14 +3647,8 @@ class Renderer:
             if hasattr(buf, "preedit_cursor"):
                 pc = buf.preedit_cursor
 
-                pe_l2 = PangoCairo.create_layout(cr)
-                pe_l2.set_font_description(self.font)
-                pe_l2.set_auto_dir(True)
-                pe_l2.set_text(buf.preedit_string, -1)
-
                 byte_index2 = visual_byte_index(buf.preedit_string, pc)
-                strong_pos2, weak_pos2 = pe_l2.get_cursor_pos(byte_index2)
-                cw = strong_pos2.x // Pango.SCALE
+                cw = self.cursor_x(pe_l, buf.preedit_string, byte_index2) // Pango.SCALE
 
                 cr.set_line_width(1.0)
                 cr.move_to(px + cw, py)
@@ -3623,51 +3662,50 @@ class Renderer:
         # CURSOR
         # ============================================================
         if cursor_visible and line_visible:
-            cursor_text = buf.get_line(cl)
+            cursor_text = cursor_line_text
             
-            # Calculate visual Y position
-            # If word wrap is enabled, we need to sum up heights of all previous visible lines
+            # Visual Y position: wrapped rows vary in height, so take the
+            # cursor line's top from the text pass
             if word_wrap_enabled:
-                cy = 0
-                target_ln = scroll_line
-                # alloc is passed as argument
-                wrap_width = int((alloc.width - ln_width - 20) * Pango.SCALE)
-                
-                # Iterate to find the cursor line's Y position
-                while target_ln < cl:
-                    text = buf.get_line(target_ln)
-                    layout = self.create_text_layout(cr, text if text else " ")
-                    layout.set_wrap(Pango.WrapMode.WORD_CHAR)
-                    layout.set_width(wrap_width)
-                    _, h = layout.get_pixel_size()
-                    cy += max(self.line_h, h)
-                    target_ln += 1
+                cy = row_ys[cl - first_ln]
             else:
-                from_scroll = cl - scroll_line
-                cy = from_scroll * self.line_h
+                cy = cursor_y
 
-            # Create layout for cursor line
-            layout = self.create_text_layout(cr, cursor_text if cursor_text else " ")
-            
-            if word_wrap_enabled:
-                # alloc is passed as argument
-                wrap_width = int((alloc.width - ln_width - 20) * Pango.SCALE)
-                layout.set_wrap(Pango.WrapMode.WORD_CHAR)
-                layout.set_width(wrap_width)
+            # Layout for cursor line: the text pass above has normally just
+            # built it with the same wrap width
+            cached = drawn_layouts.get(cl)
+            if cached is not None and cached[0] == cursor_text and cached[1] == wrap_key:
+                _, _, layout, text_w, is_rtl = cached
+                if word_wrap_enabled:
+                    base_x = ln_width
+                else:
+                    base_x = self.calculate_text_base_x(is_rtl, text_w, alloc.width, ln_width, scroll_x)
+            elif word_wrap_enabled:
+                layout = self.get_scratch_layout(cr, cursor_text if cursor_text else " ", wrap_width)
                 base_x = ln_width
+            elif windowed_line(cursor_text):
+                layout = None
+                text_w = self.mono_width(len(cursor_text))
+                base_x = self.calculate_text_base_x(False, text_w, alloc.width, ln_width, scroll_x)
             else:
+                layout = self.get_scratch_layout(cr, cursor_text if cursor_text else " ")
                 is_rtl = detect_rtl_line(cursor_text)
                 text_w, _ = layout.get_pixel_size()
                 view_w = alloc.width
                 base_x = self.calculate_text_base_x(is_rtl, text_w, view_w, ln_width, scroll_x)
 
-            byte_idx = visual_byte_index(cursor_text, cc)
-            strong_pos, _ = layout.get_cursor_pos(byte_idx)
-            
-            # Calculate cursor position within the layout
-            cx = base_x + (strong_pos.x // Pango.SCALE)
-            cursor_y_offset = strong_pos.y // Pango.SCALE
-            cursor_height = strong_pos.height // Pango.SCALE
+            if layout is None:
+                cx = base_x + self.mono_width(min(cc, len(cursor_text)))
+                cursor_y_offset = 0
+                cursor_height = self.line_h
+            else:
+                byte_idx = visual_byte_index(cursor_text, cc)
+                strong_pos = self.cursor_pos(layout, cursor_text, byte_idx)
+                
+                # Calculate cursor position within the layout
+                cx = base_x + (strong_pos.x // Pango.SCALE)
+                cursor_y_offset = strong_pos.y // Pango.SCALE
+                cursor_height = strong_pos.height // Pango.SCALE
             
             # Ensure minimum cursor height
             if cursor_height == 0:
@@ -3675,8 +3713,7 @@ class Renderer:
 
             # Draw cursor line
             phase = cursor_phase if cursor_phase is not None else 0.0
-            alpha = 0.3 + 0.7 * phase
-            cr.set_source_rgba(0, 0.5, 1.0, alpha)
+            cr.set_source_rgba(0, 0.5, 1.0, self.cursor_alpha(phase))
             cr.set_line_width(2)
             cr.move_to(cx, cy + cursor_y_offset)
             cr.line_to(cx, cy + cursor_y_offset + cursor_height)
@@ -3686,73 +3723,64 @@ class Renderer:
         # DRAG-AND-DROP PREVIEW OVERLAY
         # ============================================================
         # Draw preview overlay at drop position
-        if hasattr(buf, '_view') and buf._view:
-            view = buf._view
+        if view:
             if view.drag_and_drop_mode and view.drop_position_line >= 0:
                 drop_ln = view.drop_position_line
                 drop_col = view.drop_position_col
                 
                 # Check if drop position is within original selection (no-op)
-                drop_in_selection = False
-                if buf.selection.has_selection():
-                    bounds = buf.selection.get_bounds()
-                    if bounds and bounds[0] is not None:
-                        sel_start_line, sel_start_col, sel_end_line, sel_end_col = bounds
-                        
-                        if sel_start_line == sel_end_line:
-                            # Single line selection
-                            if drop_ln == sel_start_line and sel_start_col <= drop_col <= sel_end_col:
-                                drop_in_selection = True
-                        else:
-                            # Multi-line selection
-                            if drop_ln == sel_start_line and drop_col >= sel_start_col:
-                                drop_in_selection = True
-                            elif drop_ln == sel_end_line and drop_col <= sel_end_col:
-                                drop_in_selection = True
-                            elif sel_start_line < drop_ln < sel_end_line:
-                                drop_in_selection = True
+                drop_in_selection = buf.selection.contains_position(drop_ln, drop_col)
                 
                 # Draw overlay even if over selection, but skip cursor
                 if scroll_line <= drop_ln < scroll_line + max_vis:
                     # Calculate drop Y position accounting for word wrap
-                    if word_wrap_enabled:
-                        drop_y = 0
-                        target_ln = scroll_line
-                        wrap_width = int((alloc.width - ln_width - 20) * Pango.SCALE)
-                        
-                        # Sum up heights of all lines before drop line
-                        while target_ln < drop_ln:
+                    # (wrapped row tops come from the text pass)
+                    if word_wrap_enabled and drop_ln - first_ln < len(row_ys):
+                        drop_y = row_ys[drop_ln - first_ln]
+                    elif word_wrap_enabled:
+                        # Past the last line (the buffer shrank under the
+                        # drag): stack the rows below the recorded ones
+                        drop_y = row_ys[-1] if row_ys else 0
+                        for target_ln in range(first_ln + max(0, len(row_ys) - 1), drop_ln):
                             text = buf.get_line(target_ln)
-                            temp_layout = self.create_text_layout(cr, text if text else " ")
-                            temp_layout.set_wrap(Pango.WrapMode.WORD_CHAR)
-                            temp_layout.set_width(wrap_width)
+                            temp_layout = self.get_scratch_layout(cr, text if text else " ", wrap_width)
                             _, h = temp_layout.get_pixel_size()
                             drop_y += max(self.line_h, h)
-                            target_ln += 1
                     else:
                         drop_y = (drop_ln - scroll_line) * self.line_h
                     
-                    drop_text = buf.get_line(drop_ln)
-                    
-                    # Calculate drop position
-                    layout = self.create_text_layout(cr, drop_text if drop_text else " ")
+                    drop_text = cursor_line_text if drop_ln == cl else buf.get_line(drop_ln)
                     
-                    # Apply word wrap settings if enabled
-                    if word_wrap_enabled:
-                        layout.set_wrap(Pango.WrapMode.WORD_CHAR)
-                        wrap_width = int((alloc.width - ln_width - 20) * Pango.SCALE)
-                        layout.set_width(wrap_width)
+                    # Calculate drop position (unwrapped visible lines
+                    # already have a layout from the text pass)
+                    cached = drawn_layouts.get(drop_ln)
+                    if cached is not None and cached[0] == drop_text and cached[1] == wrap_key:
+                        _, _, layout, text_w, is_rtl = cached
+                        if word_wrap_enabled:
+                            base_x = ln_width
+                        else:
+                            base_x = self.calculate_text_base_x(is_rtl, text_w, alloc.width, ln_width, scroll_x)
+                    elif word_wrap_enabled:
+                        layout = self.get_scratch_layout(cr, drop_text if drop_text else " ", wrap_width)
                         base_x = ln_width
+                    elif windowed_line(drop_text):
+                        layout = None
+                        text_w = self.mono_width(len(drop_text))
+                        base_x = self.calculate_text_base_x(False, text_w, alloc.width, ln_width, scroll_x)
                     else:
+                        layout = self.get_scratch_layout(cr, drop_text if drop_text else " ")
                         is_rtl = detect_rtl_line(drop_text)
                         text_w, _ = layout.get_pixel_size()
                         view_w = alloc.width
                         base_x = self.calculate_text_base_x(is_rtl, text_w, view_w, ln_width, scroll_x)
                     
                     # Get x position for drop column
-                    drop_byte_idx = visual_byte_index(drop_text, min(drop_col, len(drop_text)))
-                    strong_pos, _ = layout.get_cursor_pos(drop_byte_idx)
-                    drop_x = base_x + (strong_pos.x // Pango.SCALE)
+                    if layout is None:
+                        drop_x = base_x + self.mono_width(min(drop_col, len(drop_text)))
+                    else:
+                        drop_byte_idx = visual_byte_index(drop_text, min(drop_col, len(drop_text)))
+                        strong_pos = self.cursor_pos(layout, drop_text, drop_byte_idx)
+                        drop_x = base_x + (strong_pos.x // Pango.SCALE)
                     
                     # For wrapped lines, also need to add the Y offset within the wrapped line
                     if word_wrap_enabled:
@@ -3797,7 +3825,7 @@ class Renderer:
                         is_multiline = '\n' in dragged_text
                         
                         # Create layout for dragged text
-                        overlay_layout = self.create_text_layout(cr, dragged_text)
+                        overlay_layout = self.get_scratch_layout(cr, dragged_text)
                         overlay_w, overlay_h = overlay_layout.get_pixel_size()
                         
                         # Offset the overlay below the cursor so pointer is above it
@@ -3823,13 +3851,20 @@ class Renderer:
 #   VIEW
 # ============================================================
 
+class _Alloc:
+    """Drawing area size handed to Renderer.draw."""
+
+    __slots__ = ('width', 'height')
+
+
 class VirtualTextView(Gtk.DrawingArea):
 
     def __init__(self, buf):
         super().__init__()
         self.buf = buf
-        # Add reference from buffer to view for drag-and-drop
-        buf._view = self
+        # Add reference from buffer to view for drag-and-drop; weak, so the
+        # buffer does not keep the view alive (no view/buffer cycle)
+        buf._view = weakref.ref(self)
         self.renderer = Renderer()
         self.ctrl = InputController(self, buf)
         self.scroll_line = 0
@@ -3889,6 +3924,13 @@ class VirtualTextView(Gtk.DrawingArea):
         # Preedit state
         self.preedit_string = ""
         self.preedit_cursor = 0
+
+        # Off-screen context and layouts reused by IM cursor placement and
+        # hit testing instead of building a surface per keystroke or click
+        self._im_surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
+        self._im_cr = cairo.Context(self._im_surface)
+        self._im_layout = self.create_text_layout(self._im_cr)
+        self._hit_layout = self.create_text_layout(self._im_cr)
         
         # Connect focus events
         focus = Gtk.EventControllerFocus()
@@ -3899,21 +3941,39 @@ class VirtualTextView(Gtk.DrawingArea):
         # Cursor blink state
         # Cursor blink state (smooth fade)
         self.cursor_visible = True
-        self.cursor_blink_timeout = None
+        self.cursor_blink_timeout = None  # tick callback id
 
         self.cursor_phase = 0.0           # animation phase 0 → 2
-        self.cursor_fade_speed = 0.03     # 0.02 ~ 50fps smooth fade
+        self.cursor_fade_speed = 0.03     # phase step per 20 ms (50fps smooth fade)
+        self._blink_frame_time = 0        # frame clock µs of the last step
+        self._blink_alpha_q = None        # 8-bit cursor alpha last drawn
+        self._blink_restart_id = None     # pending restart_blink_after_idle
+
+        # Deferred post-keypress updates (see queue_cursor_update)
+        self._cursor_update_id = None
+        self._scrollbar_update_pending = False
+        self._scrollbar_idle_id = None
+        self._scrollbar_state = None      # Inputs of the last update_scrollbar
+        self._alloc = _Alloc()            # Reused by draw_view every frame
 
         self.start_cursor_blink()
-        
-        # Connect to size changes to update scrollbars
-        self.connect('resize', self.on_resize)
 
     def on_buffer_changed(self, *args):
-        # Update scrollbars after width changes
-        self.update_scrollbar()
+        # Update scrollbars after width changes, once per burst of edits
+        self.queue_scrollbar_update()
         self.queue_draw()
 
+    def queue_scrollbar_update(self):
+        """Run update_scrollbar once, just ahead of the next redraw."""
+        if self._scrollbar_idle_id is None:
+            self._scrollbar_idle_id = GLib.idle_add(
+                self._flush_scrollbar_update, priority=GLib.PRIORITY_HIGH_IDLE + 10)
+
+    def _flush_scrollbar_update(self):
+        self._scrollbar_idle_id = None
+        self.update_scrollbar()
+        return False
+
 
     def on_vadj_changed(self, adj):
         # When scrollbar moves → update internal scroll line
@@ -3953,12 +4013,20 @@ class VirtualTextView(Gtk.DrawingArea):
         total_lines = self.buf.total()
         line_h = self.renderer.line_h
         visible = max(1, height // line_h)
+        doc_w = self.renderer.max_line_width
+
+        # Most edits change neither the line count nor the widest line;
+        # then the adjustments and scrollbar visibility are already right
+        state = (total_lines, visible, doc_w, viewport_width, self.word_wrap)
+        changed = state != self._scrollbar_state
+        self._scrollbar_state = state
 
-        self.vadj.set_lower(0)
-        self.vadj.set_upper(total_lines)
-        self.vadj.set_page_size(visible)
-        self.vadj.set_step_increment(1)
-        self.vadj.set_page_increment(visible)
+        if changed:
+            self.vadj.set_lower(0)
+            self.vadj.set_upper(total_lines)
+            self.vadj.set_page_size(visible)
+            self.vadj.set_step_increment(1)
+            self.vadj.set_page_increment(visible)
 
         max_scroll = max(0, total_lines - visible)
         if self.scroll_line > max_scroll:
@@ -3966,27 +4034,30 @@ class VirtualTextView(Gtk.DrawingArea):
             self.vadj.set_value(self.scroll_line)
 
         # horizontal
-        doc_w = self.renderer.max_line_width
-
-        self.hadj.set_lower(0)
-        self.hadj.set_upper(doc_w)
-        self.hadj.set_page_size(viewport_width)
-        self.hadj.set_step_increment(20)
-        self.hadj.set_page_increment(viewport_width // 2)
+        if changed:
+            self.hadj.set_lower(0)
+            self.hadj.set_upper(doc_w)
+            self.hadj.set_page_size(viewport_width)
+            self.hadj.set_step_increment(20)
+            self.hadj.set_page_increment(viewport_width // 2)
 
         max_hscroll = max(0, doc_w - viewport_width)
         if self.scroll_x > max_hscroll:
             self.scroll_x = max_hscroll
             self.hadj.set_value(self.scroll_x)
 
+        # Wheel scrolling moves the view without the adjustments; bring the
+        # thumbs along (a no-op for the adjustments when already there)
+        self.vadj.set_value(self.scroll_line)
+        self.hadj.set_value(self.scroll_x)
+
+        if not changed:
+            return
+
         def finalize():
             self.vscroll.set_visible(total_lines > visible)
             # Hide horizontal scrollbar if word wrap is enabled
-            word_wrap_enabled = False
-            if hasattr(self.buf, '_view') and hasattr(self.buf._view, 'word_wrap'):
-                word_wrap_enabled = self.buf._view.word_wrap
-            
-            if word_wrap_enabled:
+            if self.word_wrap:
                 self.hscroll.set_visible(False)
             else:
                 self.hscroll.set_visible(doc_w > viewport_width)
@@ -3998,17 +4069,15 @@ class VirtualTextView(Gtk.DrawingArea):
 
     # Correct UTF-8 byte-index for logical col → Pango visual mapping
     def visual_byte_index(self, text, col):
-        b = 0
-        for ch in text[:col]:
-            b += len(ch.encode("utf-8"))
-        return b
+        return column_to_byte(text, col)
 
-    def pixel_to_column(self, cr, text, px):
+    def pixel_to_column(self, cr, text, px, layout=None):
         """Convert pixel position to column index, handling end-of-line"""
         if not text:
             return 0
             
-        layout = self.create_text_layout(cr, text)
+        if layout is None:
+            layout = self.create_text_layout(cr, text)
 
         # Get total text width
         text_w, _ = layout.get_pixel_size()
@@ -4027,37 +4096,50 @@ class VirtualTextView(Gtk.DrawingArea):
                 return len(text)
 
         # index = byte offset → convert back to UTF-8 column
-        substr = text.encode("utf-8")[:index]
-        try:
-            col = len(substr.decode("utf-8"))
-            # Add trailing characters (for clicking on right side of character)
-            col += trailing
-            return min(col, len(text))
-        except:
-            return len(text)
+        col = byte_to_column(text, index)
+        # Add trailing characters (for clicking on right side of character)
+        col += trailing
+        return min(col, len(text))
 
 
     def start_cursor_blink(self):
         # Always start blinking from fully visible
         self.cursor_phase = 0.0
-
-        def blink():
-            self.cursor_phase += self.cursor_fade_speed
-            if self.cursor_phase >= 2.0:
-                self.cursor_phase -= 2.0
-
-            self.queue_draw()
+        self._blink_frame_time = 0
+        self._blink_alpha_q = None
+
+        # Driven by the frame clock, so it only runs while the view is
+        # mapped and never faster than the display refreshes
+        def blink(widget, frame_clock):
+            now = frame_clock.get_frame_time()
+            if not self._blink_frame_time:
+                self._blink_frame_time = now
+                return True
+            elapsed = now - self._blink_frame_time
+            if elapsed < 20000:
+                return True  # keep the 50fps fade rate on faster displays
+
+            self._blink_frame_time = now
+            self.cursor_phase += self.cursor_fade_speed * elapsed / 20000
+            self.cursor_phase %= 2.0
+
+            # Skip frames whose cursor would look the same: the alpha is
+            # drawn in 8 bits and holds at 1.0 for half of the cycle
+            alpha_q = round(self.renderer.cursor_alpha(self.cursor_phase) * 255)
+            if alpha_q != self._blink_alpha_q:
+                self._blink_alpha_q = alpha_q
+                self.queue_draw()
             return True
 
         if self.cursor_blink_timeout:
-            GLib.source_remove(self.cursor_blink_timeout)
+            self.remove_tick_callback(self.cursor_blink_timeout)
 
-        self.cursor_blink_timeout = GLib.timeout_add(20, blink)
+        self.cursor_blink_timeout = self.add_tick_callback(blink)
 
 
     def stop_cursor_blink(self):
         if self.cursor_blink_timeout:
-            GLib.source_remove(self.cursor_blink_timeout)
+            self.remove_tick_callback(self.cursor_blink_timeout)
             self.cursor_blink_timeout = None
 
         self.cursor_visible = True
@@ -4091,10 +4173,16 @@ class VirtualTextView(Gtk.DrawingArea):
 
 
     def restart_blink_after_idle(self):
+        # Each keystroke pushes the restart back rather than adding a timer
+        if self._blink_restart_id:
+            GLib.source_remove(self._blink_restart_id)
+
         def idle_blink():
-            self.start_cursor_blink()
+            self._blink_restart_id = None
+            if self.has_focus():
+                self.start_cursor_blink()
             return False  # one-shot
-        GLib.timeout_add(700, idle_blink)  # restart after 700ms idle
+        self._blink_restart_id = GLib.timeout_add(700, idle_blink)  # restart after 700ms idle
 
 
 
@@ -4124,9 +4212,15 @@ class VirtualTextView(Gtk.DrawingArea):
         self.im.focus_in()
         self.im.set_client_widget(self)
         self.update_im_cursor_location()
+        self.start_cursor_blink()
         
     def on_focus_out(self, controller):
             self.im.focus_out()
+            # No blink redraws while another widget has the focus
+            if self._blink_restart_id:
+                GLib.source_remove(self._blink_restart_id)
+                self._blink_restart_id = None
+            self.stop_cursor_blink()
 
     def update_im_cursor_location(self):
         try:
@@ -4139,13 +4233,8 @@ class VirtualTextView(Gtk.DrawingArea):
             line_text = self.buf.get_line(cl)
 
             # Pango layout
-            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
-            cr = cairo.Context(surface)
-
-            layout = self.create_text_layout(cr, line_text if line_text else " ")
-
-            is_rtl = detect_rtl_line(line_text)
-            text_w, _ = layout.get_pixel_size()
+            cr = self._im_cr
+            layout, text_w, is_rtl = self.renderer.line_layout(cr, cl, line_text, self._im_layout)
             ln_w = self.renderer.calculate_line_number_width(cr, self.buf.total())
 
             # base_x matches draw()
@@ -4154,8 +4243,7 @@ class VirtualTextView(Gtk.DrawingArea):
             # ---- FIXED: correct UTF-8 byte index ----
             byte_index = self.visual_byte_index(line_text, cc)
 
-            strong_pos, weak_pos = layout.get_cursor_pos(byte_index)
-            cursor_x = strong_pos.x // Pango.SCALE
+            cursor_x = self.renderer.cursor_x(layout, line_text, byte_index) // Pango.SCALE
 
             x = base_x + cursor_x
             y = (cl - self.scroll_line) * self.renderer.line_h
@@ -4179,216 +4267,214 @@ class VirtualTextView(Gtk.DrawingArea):
             print(f"IM cursor location error: {e}")
 
                 
+    def queue_cursor_update(self, scrollbar=False):
+        """Scroll to the cursor, move the IM cursor and redraw, once.
+        
+        Key autorepeat can deliver several presses per frame; their updates
+        collapse into a single flush that runs just ahead of the redraw.
+        """
+        if scrollbar:
+            self._scrollbar_update_pending = True
+        if self._cursor_update_id is None:
+            self._cursor_update_id = GLib.idle_add(
+                self._flush_cursor_update, priority=GLib.PRIORITY_HIGH_IDLE + 10)
+
+    def _flush_cursor_update(self):
+        self._cursor_update_id = None
+        self.keep_cursor_visible()
+        self.update_im_cursor_location()
+        self.queue_draw()
+        if self._scrollbar_update_pending:
+            self._scrollbar_update_pending = False
+            self.update_scrollbar()
+        return False
+
     def on_key(self, c, keyval, keycode, state):
-        # Let IM filter the event FIRST
-        event = c.get_current_event()
-        if event and self.im.filter_keypress(event):
-            return True
+        # Let IM filter the event FIRST (unless it cannot want it)
+        if self.preedit_string or keyval not in _NAV_KEYVALS:
+            event = c.get_current_event()
+            if event and self.im.filter_keypress(event):
+                return True
 
+        # Printable ASCII only has Ctrl+letter bindings; skip the name lookup
+        # for plain typing the IM did not take
+        if 0x20 <= keyval < 0x7F and not (state & _CTRL):
+            return False
 
-        name = Gdk.keyval_name(keyval)
-        shift_pressed = (state & Gdk.ModifierType.SHIFT_MASK) != 0
-        ctrl_pressed = (state & Gdk.ModifierType.CONTROL_MASK) != 0
-        alt_pressed = (state & Gdk.ModifierType.ALT_MASK) != 0
+        handler = self._key_handlers.get(Gdk.keyval_name(keyval))
+        if handler is None:
+            return False
 
-        # Alt+Arrow keys for text movement
-        if alt_pressed and name == "Left":
-            self.buf.move_word_left_with_text()
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
-        elif alt_pressed and name == "Right":
-            self.buf.move_word_right_with_text()
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
-        elif alt_pressed and name == "Up":
-            self.buf.move_line_up_with_text()
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
-        elif alt_pressed and name == "Down":
-            self.buf.move_line_down_with_text()
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
+        shift_pressed = (state & _SHIFT) != 0
+        ctrl_pressed = (state & _CTRL) != 0
+        alt_pressed = (state & _ALT) != 0
+        return handler(ctrl_pressed, shift_pressed, alt_pressed)
 
-        if keyval == Gdk.KEY_Tab:
-            # Check for Shift+Tab (Unindent)
-            if (state & Gdk.ModifierType.SHIFT_MASK):
-                self.buf.unindent_selection()
-                self.queue_draw()
-                return True
-            
-            # Check for Multi-line Indent
-            if self.buf.selection.has_selection():
-                start_line, _, end_line, _ = self.buf.selection.get_bounds()
-                if start_line != end_line:
-                    self.buf.indent_selection()
-                    self.queue_draw()
-                    return True
-            
-            # Normal Tab (Insert spaces)
-            self.buf.insert_text("    ")
-            self.queue_draw()
-            return True
+    # Key handlers: called by on_key with (ctrl, shift, alt) and return
+    # True when they consumed the key
 
-        if keyval == Gdk.KEY_ISO_Left_Tab:
+    def _key_tab(self, ctrl, shift, alt):
+        # Check for Shift+Tab (Unindent)
+        if shift:
             self.buf.unindent_selection()
             self.queue_draw()
             return True
         
-        # Ctrl+A - Select All
-        if ctrl_pressed and name == "a":
-            self.buf.select_all()
-            self.queue_draw()
-            return True
-        
-        # Ctrl+C - Copy
-        if ctrl_pressed and name == "c":
-            self.copy_to_clipboard()
-            return True
-        
-        # Ctrl+X - Cut
-        if ctrl_pressed and name == "x":
-            self.cut_to_clipboard()
-            return True
-        
-        # Ctrl+V - Paste
-        if ctrl_pressed and name == "v":
-            self.paste_from_clipboard()
-            return True
+        # Check for Multi-line Indent
+        if self.buf.selection.has_selection():
+            start_line, _, end_line, _ = self.buf.selection.get_bounds()
+            if start_line != end_line:
+                self.buf.indent_selection()
+                self.queue_draw()
+                return True
         
-        # Tab key - insert tab character
-        if name == "Tab":
-            self.buf.insert_text("\t")
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
+        # Normal Tab (Insert spaces)
+        self.buf.insert_text("    ")
+        self.queue_draw()
+        return True
 
-        # Editing keys
-        if name == "BackSpace":
-            if ctrl_pressed and shift_pressed:
-                # Ctrl+Shift+Backspace: Delete to start of line
-                self.buf.delete_to_line_start()
-            elif ctrl_pressed:
-                # Ctrl+Backspace: Delete word backward
-                self.buf.delete_word_backward()
-            else:
-                # Normal backspace
-                self.buf.backspace()
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
+    def _key_left_tab(self, ctrl, shift, alt):
+        self.buf.unindent_selection()
+        self.queue_draw()
+        return True
 
-        if name == "Delete":
-            if ctrl_pressed and shift_pressed:
-                # Ctrl+Shift+Delete: Delete to end of line
-                self.buf.delete_to_line_end()
-            elif ctrl_pressed:
-                # Ctrl+Delete: Delete word forward
-                self.buf.delete_word_forward()
-            else:
-                # Normal delete
-                self.buf.delete_key()
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
-        
-        # Ctrl+D: Delete current line
-        if ctrl_pressed and name == "d":
-            self.buf.delete_current_line()
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
+    # Ctrl+A - Select All
+    def _key_a(self, ctrl, shift, alt):
+        if not ctrl:
+            return False
+        self.buf.select_all()
+        self.queue_draw()
+        return True
 
-        if name == "Return":
-            self.buf.insert_newline()
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            self.update_scrollbar() 
-            return True
+    # Ctrl+C - Copy
+    def _key_c(self, ctrl, shift, alt):
+        if not ctrl:
+            return False
+        self.copy_to_clipboard()
+        return True
 
-        # Navigation with selection support
-        if name == "Up":
-            self.ctrl.move_up(extend_selection=shift_pressed)
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
-        elif name == "Down":
-            self.ctrl.move_down(extend_selection=shift_pressed)
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
-        elif name == "Left":
-            if ctrl_pressed:
-                # Proper word navigation
-                self.ctrl.move_word_left(extend_selection=shift_pressed)
-            else:
-                self.ctrl.move_left(extend_selection=shift_pressed)
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
-        elif name == "Right":
-            if ctrl_pressed:
-                # Proper word navigation
-                self.ctrl.move_word_right(extend_selection=shift_pressed)
-            else:
-                self.ctrl.move_right(extend_selection=shift_pressed)
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
-        elif name == "Home":
-            if ctrl_pressed:
-                self.ctrl.move_document_start(extend_selection=shift_pressed)
-            else:
-                self.ctrl.move_home(extend_selection=shift_pressed)
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
-        elif name == "End":
-            if ctrl_pressed:
-                self.ctrl.move_document_end(extend_selection=shift_pressed)
-            else:
-                self.ctrl.move_end(extend_selection=shift_pressed)
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
-        elif name == "Page_Up":
-            # Move up by visible lines
-            visible_lines = self.get_height() // self.renderer.line_h
-            for _ in range(visible_lines):
-                self.ctrl.move_up(extend_selection=shift_pressed)
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
-        elif name == "Page_Down":
-            # Move down by visible lines
-            visible_lines = self.get_height() // self.renderer.line_h
-            for _ in range(visible_lines):
-                self.ctrl.move_down(extend_selection=shift_pressed)
-            self.keep_cursor_visible()
-            self.update_im_cursor_location()
-            self.queue_draw()
-            return True
+    # Ctrl+X - Cut
+    def _key_x(self, ctrl, shift, alt):
+        if not ctrl:
+            return False
+        self.cut_to_clipboard()
+        return True
 
-        return False
+    # Ctrl+V - Paste
+    def _key_v(self, ctrl, shift, alt):
+        if not ctrl:
+            return False
+        self.paste_from_clipboard()
+        return True
+
+    # Ctrl+D: Delete current line
+    def _key_d(self, ctrl, shift, alt):
+        if not ctrl:
+            return False
+        self.buf.delete_current_line()
+        self.queue_cursor_update()
+        return True
+
+    def _key_backspace(self, ctrl, shift, alt):
+        if ctrl and shift:
+            # Ctrl+Shift+Backspace: Delete to start of line
+            self.buf.delete_to_line_start()
+        elif ctrl:
+            # Ctrl+Backspace: Delete word backward
+            self.buf.delete_word_backward()
+        else:
+            # Normal backspace
+            self.buf.backspace()
+        self.queue_cursor_update()
+        return True
+
+    def _key_delete(self, ctrl, shift, alt):
+        if ctrl and shift:
+            # Ctrl+Shift+Delete: Delete to end of line
+            self.buf.delete_to_line_end()
+        elif ctrl:
+            # Ctrl+Delete: Delete word forward
+            self.buf.delete_word_forward()
+        else:
+            # Normal delete
+            self.buf.delete_key()
+        self.queue_cursor_update()
+        return True
+
+    def _key_return(self, ctrl, shift, alt):
+        self.buf.insert_newline()
+        self.queue_cursor_update(scrollbar=True)
+        return True
+
+    # Navigation with selection support; Alt+Arrow moves text instead
+
+    def _key_up(self, ctrl, shift, alt):
+        if alt:
+            self.buf.move_line_up_with_text()
+        else:
+            self.ctrl.move_up(extend_selection=shift)
+        self.queue_cursor_update()
+        return True
+
+    def _key_down(self, ctrl, shift, alt):
+        if alt:
+            self.buf.move_line_down_with_text()
+        else:
+            self.ctrl.move_down(extend_selection=shift)
+        self.queue_cursor_update()
+        return True
+
+    def _key_left(self, ctrl, shift, alt):
+        if alt:
+            self.buf.move_word_left_with_text()
+        elif ctrl:
+            # Proper word navigation
+            self.ctrl.move_word_left(extend_selection=shift)
+        else:
+            self.ctrl.move_left(extend_selection=shift)
+        self.queue_cursor_update()
+        return True
+
+    def _key_right(self, ctrl, shift, alt):
+        if alt:
+            self.buf.move_word_right_with_text()
+        elif ctrl:
+            # Proper word navigation
+            self.ctrl.move_word_right(extend_selection=shift)
+        else:
+            self.ctrl.move_right(extend_selection=shift)
+        self.queue_cursor_update()
+        return True
+
+    def _key_home(self, ctrl, shift, alt):
+        if ctrl:
+            self.ctrl.move_document_start(extend_selection=shift)
+        else:
+            self.ctrl.move_home(extend_selection=shift)
+        self.queue_cursor_update()
+        return True
+
+    def _key_end(self, ctrl, shift, alt):
+        if ctrl:
+            self.ctrl.move_document_end(extend_selection=shift)
+        else:
+            self.ctrl.move_end(extend_selection=shift)
+        self.queue_cursor_update()
+        return True
+
+    def _key_page_up(self, ctrl, shift, alt):
+        # Move up by visible lines
+        visible_lines = self.get_height() // self.renderer.line_h
+        self.ctrl.move_vertical(-visible_lines, extend_selection=shift)
+        self.queue_cursor_update()
+        return True
+
+    def _key_page_down(self, ctrl, shift, alt):
+        # Move down by visible lines
+        visible_lines = self.get_height() // self.renderer.line_h
+        self.ctrl.move_vertical(visible_lines, extend_selection=shift)
+        self.queue_cursor_update()
+        return True
 
     def copy_to_clipboard(self):
         """Copy selected text to clipboard"""
@@ -4421,11 +4507,12 @@ class VirtualTextView(Gtk.DrawingArea):
             except Exception as e:
                 error_msg = str(e)
                 # Silently ignore "No compatible transfer format" errors
-                # This happens when clipboard contains non-text data (images, etc.)
+                # This happens when clipboard contains non-text data (images, etc.),
+                # so there is no text for the fallback to find either
                 if "No compatible transfer format" not in error_msg:
                     print(f"Paste error: {e}")
-                # Optionally try to get text in a different way
-                self.try_paste_fallback()
+                    # Optionally try to get text in a different way
+                    self.try_paste_fallback()
         
         clipboard.read_text_async(None, paste_ready)
 
@@ -4461,6 +4548,28 @@ class VirtualTextView(Gtk.DrawingArea):
             pass
 
     def install_keys(self):
+        # Key name → handler, so on_key does one lookup per keystroke
+        self._key_handlers = {
+            "Tab": self._key_tab,
+            "ISO_Left_Tab": self._key_left_tab,
+            "a": self._key_a,
+            "c": self._key_c,
+            "x": self._key_x,
+            "v": self._key_v,
+            "d": self._key_d,
+            "BackSpace": self._key_backspace,
+            "Delete": self._key_delete,
+            "Return": self._key_return,
+            "Up": self._key_up,
+            "Down": self._key_down,
+            "Left": self._key_left,
+            "Right": self._key_right,
+            "Home": self._key_home,
+            "End": self._key_end,
+            "Page_Up": self._key_page_up,
+            "Page_Down": self._key_page_down,
+        }
+
         key = Gtk.EventControllerKey()
         key.connect("key-pressed", self.on_key)
         key.connect("key-released", self.on_key_release)
@@ -4468,6 +4577,8 @@ class VirtualTextView(Gtk.DrawingArea):
         
     def on_key_release(self, c, keyval, keycode, state):
         """Filter key releases for IM"""
+        if not self.preedit_string and keyval in _NAV_KEYVALS:
+            return False
         event = c.get_current_event()
         if event and self.im.filter_keypress(event):
             return True
@@ -4499,6 +4610,32 @@ class VirtualTextView(Gtk.DrawingArea):
         right_click.connect("pressed", self.on_right_click)
         self.add_controller(right_click)
         
+        # Context menu is built once; on_right_click only picks the model
+        self.menu_sel = self.build_context_menu(True)
+        self.menu_nosel = self.build_context_menu(False)
+        self.context_menu = Gtk.PopoverMenu()
+        self.context_menu.set_parent(self)
+        self.context_menu.set_has_arrow(False)
+        
+        self.action_group = Gio.SimpleActionGroup()
+        self.insert_action_group("view", self.action_group)
+        
+        # Create actions using a loop
+        actions = [
+            ("cut", self.cut_to_clipboard),
+            ("copy", self.copy_to_clipboard),
+            ("paste", self.paste_from_clipboard),
+            ("delete", self.on_delete_action),
+            ("select-all", lambda: self.buf.select_all()),
+            ("undo", self.on_undo_action),
+            ("redo", self.on_redo_action),
+        ]
+        
+        for action_name, callback in actions:
+            action = Gio.SimpleAction.new(action_name, None)
+            action.connect("activate", lambda a, p, cb=callback: cb())
+            self.action_group.add_action(action)
+        
         # Track last click time and position for multi-click detection
         self.last_click_time = 0
         self.last_click_line = -1
@@ -4526,6 +4663,10 @@ class VirtualTextView(Gtk.DrawingArea):
         
         # Track if a drag might start (deferred until movement)
         self._drag_pending = False
+        
+        # Latest drag sample not yet hit-tested, and its idle source
+        self._drag_motion = None
+        self._drag_motion_id = None
 
     def on_middle_click(self, gesture, n_press, x, y):
         """Paste from primary clipboard on middle-click"""
@@ -4561,20 +4702,10 @@ class VirtualTextView(Gtk.DrawingArea):
         except Exception as e:
             print(f"Primary paste error: {e}")
 
-    def on_right_click(self, gesture, n_press, x, y):
-        """Show context menu on right-click"""
-        self.grab_focus()
-        
-        # Create popover menu
-        menu = Gtk.PopoverMenu()
-        menu.set_parent(self)
-        menu.set_has_arrow(False)
-        
-        # Create menu model
+    def build_context_menu(self, has_selection):
+        """Build the right-click menu model for the given selection state"""
         menu_model = Gio.Menu()
         
-        has_selection = self.buf.selection.has_selection()
-        
         if has_selection:
             # Menu items for when there's a selection
             menu_model.append("Cut", "view.cut")
@@ -4590,29 +4721,16 @@ class VirtualTextView(Gtk.DrawingArea):
         # Undo/Redo commented out until implemented
         menu_model.append("Undo", "view.undo")
         menu_model.append("Redo", "view.redo")
+        return menu_model
+
+    def on_right_click(self, gesture, n_press, x, y):
+        """Show context menu on right-click"""
+        self.grab_focus()
         
-        menu.set_menu_model(menu_model)
-        
-        # Create action group if not exists
-        if not hasattr(self, 'action_group'):
-            self.action_group = Gio.SimpleActionGroup()
-            self.insert_action_group("view", self.action_group)
-            
-            # Create actions using a loop
-            actions = [
-                ("cut", self.cut_to_clipboard),
-                ("copy", self.copy_to_clipboard),
-                ("paste", self.paste_from_clipboard),
-                ("delete", self.on_delete_action),
-                ("select-all", lambda: self.buf.select_all()),
-                ("undo", self.on_undo_action),
-                ("redo", self.on_redo_action),
-            ]
-            
-            for action_name, callback in actions:
-                action = Gio.SimpleAction.new(action_name, None)
-                action.connect("activate", lambda a, p, cb=callback: cb())
-                self.action_group.add_action(action)
+        # Swap in the prebuilt model matching the selection state
+        has_selection = self.buf.selection.has_selection()
+        menu = self.context_menu
+        menu.set_menu_model(self.menu_sel if has_selection else self.menu_nosel)
         
         # Position the menu at the click location with slight offset
         rect = Gdk.Rectangle()
@@ -4642,47 +4760,27 @@ class VirtualTextView(Gtk.DrawingArea):
 
     def find_word_boundaries(self, line, col):
         """Find word boundaries at the given position. Words include alphanumeric and underscore."""
-        import unicodedata
-        
         if not line:
             return 0, 0
         
-        # Check if character is a word character (letter, number, underscore, or combining mark)
-        def is_word_char(ch):
-            if ch == '_':
-                return True
-            cat = unicodedata.category(ch)
-            # Letter categories: Lu, Ll, Lt, Lm, Lo
-            # Number categories: Nd, Nl, No
-            # Mark categories: Mn, Mc, Me (for combining characters like Devanagari vowel signs)
-            return cat[0] in ('L', 'N', 'M')
+        tags = char_classes(line)
         
         # If clicking beyond line or on whitespace/punctuation, select just that position
-        if col >= len(line) or not is_word_char(line[col]):
+        if col >= len(line) or tags[col] != 'w':
             return col, min(col + 1, len(line))
         
-        # Find start of word
-        start = col
-        while start > 0 and is_word_char(line[start - 1]):
-            start -= 1
-        
-        # Find end of word
-        end = col
-        while end < len(line) and is_word_char(line[end]):
-            end += 1
-        
-        return start, end
+        # Extend over the run of word characters on both sides
+        return skip_class_left(tags, col, 'w'), skip_class_right(tags, col, 'w')
 
     def on_click_pressed(self, g, n_press, x, y):
         self.grab_focus()
 
         ln, col = self.xy_to_line_col(x, y)
         mods = g.get_current_event_state()
-        shift = bool(mods & Gdk.ModifierType.SHIFT_MASK)
+        shift = bool(mods & _SHIFT)
 
         # --- Multi-click timing ---
-        import time
-        current_time = time.time()
+        current_time = time.monotonic()
         time_diff = current_time - self.last_click_time
 
         if time_diff > 0.5 or ln != self.last_click_line or abs(col - self.last_click_col) > 3:
@@ -4702,8 +4800,7 @@ class VirtualTextView(Gtk.DrawingArea):
         if shift:
             if not self.buf.selection.active:
                 self.buf.selection.set_start(self.buf.cursor_line, self.buf.cursor_col)
-            self.buf.selection.set_end(ln, col)
-            self.buf.set_cursor(ln, col, extend_selection=True)
+            self.buf.extend_selection_to(ln, col)
             self.queue_draw()
             return
 
@@ -4711,8 +4808,7 @@ class VirtualTextView(Gtk.DrawingArea):
         # TRIPLE CLICK → select entire textual line (unchanged)
         # ----------------------------------------------------------
         if self.click_count == 3:
-            self.buf.selection.set_start(ln, 0)
-            self.buf.selection.set_end(ln, line_len)
+            self.buf.selection.set_range(ln, 0, ln, line_len)
             self.buf.cursor_line = ln
             self.buf.cursor_col = line_len
             self.queue_draw()
@@ -4732,14 +4828,12 @@ class VirtualTextView(Gtk.DrawingArea):
                 
                 if next_line_text is not None and len(next_line_text) == 0:
                     # Next line is also empty: select only current empty line
-                    self.buf.selection.set_start(ln, 0)
-                    self.buf.selection.set_end(ln, 1)
+                    self.buf.selection.set_range(ln, 0, ln, 1)
                     self.buf.cursor_line = ln
                     self.buf.cursor_col = 0
                 elif next_line_text is not None and len(next_line_text) > 0:
                     # Next line has text: select current empty line + next line's text
-                    self.buf.selection.set_start(ln, 0)
-                    self.buf.selection.set_end(ln + 1, len(next_line_text))
+                    self.buf.selection.set_range(ln, 0, ln + 1, len(next_line_text))
                     self.buf.cursor_line = ln + 1
                     self.buf.cursor_col = len(next_line_text)
                 else:
@@ -4761,8 +4855,7 @@ class VirtualTextView(Gtk.DrawingArea):
                 
                 if has_newline:
                     # Line has newline: select the newline area
-                    self.buf.selection.set_start(ln, line_len)
-                    self.buf.selection.set_end(ln, line_len + 1)
+                    self.buf.selection.set_range(ln, line_len, ln, line_len + 1)
                     self.buf.cursor_line = ln
                     self.buf.cursor_col = line_len
                 else:
@@ -4770,18 +4863,14 @@ class VirtualTextView(Gtk.DrawingArea):
                     # Find what's at the end: word or spaces
                     if line_text and line_text[-1] == ' ':
                         # Find start of trailing spaces
-                        start = line_len - 1
-                        while start > 0 and line_text[start - 1] == ' ':
-                            start -= 1
-                        self.buf.selection.set_start(ln, start)
-                        self.buf.selection.set_end(ln, line_len)
+                        start = len(line_text.rstrip(' '))
+                        self.buf.selection.set_range(ln, start, ln, line_len)
                         self.buf.cursor_line = ln
                         self.buf.cursor_col = line_len
                     else:
                         # Select the last word
                         start_col, end_col = self.find_word_boundaries(line_text, line_len - 1)
-                        self.buf.selection.set_start(ln, start_col)
-                        self.buf.selection.set_end(ln, end_col)
+                        self.buf.selection.set_range(ln, start_col, ln, end_col)
                         self.buf.cursor_line = ln
                         self.buf.cursor_col = end_col
                 
@@ -4793,8 +4882,7 @@ class VirtualTextView(Gtk.DrawingArea):
 
             # Case 3: normal double-click → word selection (unchanged)
             start_col, end_col = self.find_word_boundaries(line_text, col)
-            self.buf.selection.set_start(ln, start_col)
-            self.buf.selection.set_end(ln, end_col)
+            self.buf.selection.set_range(ln, start_col, ln, end_col)
             self.buf.cursor_line = ln
             self.buf.cursor_col = end_col
             
@@ -4813,32 +4901,14 @@ class VirtualTextView(Gtk.DrawingArea):
         # ----------------------------------------------------------
         # Check if clicking inside existing selection - if so, defer clearing
         # until we know it's not a drag operation
-        if self.buf.selection.has_selection():
-            bounds = self.buf.selection.get_bounds()
-            if bounds and bounds[0] is not None:
-                start_line, start_col, end_line, end_col = bounds
-                
-                # Check if click is within selection
-                click_in_selection = False
-                if start_line == end_line:
-                    if ln == start_line and start_col <= col < end_col:
-                        click_in_selection = True
-                else:
-                    if ln == start_line and col >= start_col:
-                        click_in_selection = True
-                    elif ln == end_line and col < end_col:
-                        click_in_selection = True
-                    elif start_line < ln < end_line:
-                        click_in_selection = True
-                
-                if click_in_selection:
-                    # Don't clear selection yet - might be starting a drag
-                    # Just update cursor position
-                    self.buf.cursor_line = ln
-                    self.buf.cursor_col = col
-                    self._clicked_in_selection = True
-                    self.queue_draw()
-                    return
+        if self.buf.selection.contains_position(ln, col, include_end=False):
+            # Don't clear selection yet - might be starting a drag
+            # Just update cursor position
+            self.buf.cursor_line = ln
+            self.buf.cursor_col = col
+            self._clicked_in_selection = True
+            self.queue_draw()
+            return
         
         # Normal single click - clear selection and start new drag
         self._clicked_in_selection = False
@@ -4861,12 +4931,9 @@ class VirtualTextView(Gtk.DrawingArea):
 
         # Get modifiers
         modifiers = g.get_current_event_state()
-        shift_pressed = (modifiers & Gdk.ModifierType.SHIFT_MASK) != 0
-
-        # Temporary Pango context
-        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
-        cr = cairo.Context(surface)
+        shift_pressed = (modifiers & _SHIFT) != 0
 
+        cr = self._im_cr
         ln_width = self.renderer.calculate_line_number_width(cr, self.buf.total())
 
         ln = self.scroll_line + int(y // self.renderer.line_h)
@@ -4876,11 +4943,8 @@ class VirtualTextView(Gtk.DrawingArea):
         
         text = self.buf.get_line(ln)
         
-        # Create layout for this line
-        layout = self.create_text_layout(cr, text if text else " ")
-        
-        is_rtl = detect_rtl_line(text)
-        text_w, _ = layout.get_pixel_size()
+        # Layout for this line
+        layout, text_w, is_rtl = self.renderer.line_layout(cr, ln, text, self._hit_layout)
         view_w = self.get_width()
         
         # Calculate base_x matching the renderer
@@ -4891,7 +4955,7 @@ class VirtualTextView(Gtk.DrawingArea):
         col_pixels = max(0, col_pixels)
 
         # Convert pixel to column
-        col = self.pixel_to_column(cr, text, col_pixels)
+        col = self.pixel_to_column(cr, text, col_pixels, layout)
         col = max(0, min(col, len(text)))
 
         # Handle shift-click for selection
@@ -4899,8 +4963,7 @@ class VirtualTextView(Gtk.DrawingArea):
             # Extend selection from current cursor position
             if not self.buf.selection.active:
                 self.buf.selection.set_start(self.buf.cursor_line, self.buf.cursor_col)
-            self.buf.selection.set_end(ln, col)
-            self.buf.set_cursor(ln, col, extend_selection=True)
+            self.buf.extend_selection_to(ln, col)
         else:
         # Normal click - clear selection and move cursor
             self.ctrl.click(ln, col)
@@ -4917,42 +4980,22 @@ class VirtualTextView(Gtk.DrawingArea):
         ln, col = self.xy_to_line_col(x, y)
         
         # Check if clicking on selected text
-        if self.buf.selection.has_selection():
-            start_line, start_col, end_line, end_col = self.buf.selection.get_bounds()
-            
-            # Check if click is within selection
-            click_in_selection = False
-            if start_line == end_line:
-                # Single line selection
-                if ln == start_line and start_col <= col < end_col:
-                    click_in_selection = True
-            else:
-                # Multi-line selection
-                if ln == start_line and col >= start_col:
-                    click_in_selection = True
-                elif ln == end_line and col < end_col:
-                    click_in_selection = True
-                elif start_line < ln < end_line:
-                    click_in_selection = True
+        if self.buf.selection.contains_position(ln, col, include_end=False):
+            # We might be starting a drag, but wait for actual movement
+            self._drag_pending = True
+            # Don't set drag_and_drop_mode yet - wait for on_drag_update,
+            # which also copies out the selected text
+            self.drag_and_drop_mode = False
             
-            if click_in_selection:
-                # We might be starting a drag, but wait for actual movement
-                self._drag_pending = True
-                # Don't set drag_and_drop_mode yet - wait for on_drag_update
-                self.drag_and_drop_mode = False
-                
-                # Store the selected text (just in case)
-                self.dragged_text = self.buf.get_selected_text()
-                
-                # Don't start normal selection drag - this preserves the selection
-                # Don't call ctrl.start_drag() to keep selection visible
-                return
+            # Don't start normal selection drag - this preserves the selection
+            # Don't call ctrl.start_drag() to keep selection visible
+            return
         
         # Normal drag behavior
     
         # Check for Shift key (Extend Selection Drag)
         mods = g.get_current_event_state()
-        shift_pressed = (mods & Gdk.ModifierType.SHIFT_MASK) != 0
+        shift_pressed = (mods & _SHIFT) != 0
         
         if shift_pressed:
             # Shift+Drag: Extend selection
@@ -4999,8 +5042,7 @@ class VirtualTextView(Gtk.DrawingArea):
 
 
     def xy_to_line_col(self, x, y):
-        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
-        cr = cairo.Context(surface)
+        cr = self._im_cr
 
         ln_width = self.renderer.calculate_line_number_width(cr, self.buf.total())
         
@@ -5009,16 +5051,14 @@ class VirtualTextView(Gtk.DrawingArea):
             current_y = 0
             target_ln = self.scroll_line
             alloc = self.get_allocation()
-            wrap_width = int((alloc.width - ln_width - 20) * Pango.SCALE)
+            # Same wrap width as Renderer.draw, so its layouts are reused
+            wrap_width = max(100, (alloc.width - ln_width - 20) * Pango.SCALE)
             
             # Iterate through visible lines to find which one was clicked
             while target_ln < self.buf.total():
                 text = self.buf.get_line(target_ln)
-                layout = self.create_text_layout(cr, text if text else " ")
-                
-                # Apply wrap settings matching Renderer.draw
-                layout.set_wrap(Pango.WrapMode.WORD_CHAR)
-                layout.set_width(wrap_width)
+                layout, _, _ = self.renderer.line_layout(
+                    cr, target_ln, text, self._hit_layout, wrap_width)
                 
                 _, h = layout.get_pixel_size()
                 line_height = max(self.renderer.line_h, h)
@@ -5037,8 +5077,7 @@ class VirtualTextView(Gtk.DrawingArea):
                     
                     # Convert byte index to character column
                     if text:
-                        byte_slice = text.encode('utf-8')[:index]
-                        col = len(byte_slice.decode('utf-8', errors='ignore'))
+                        col = byte_to_column(text, index)
                         if trailing > 0:
                             col += 1
                     else:
@@ -5063,12 +5102,8 @@ class VirtualTextView(Gtk.DrawingArea):
 
         text = self.buf.get_line(ln)
 
-        # Create layout for RTL/LTR measurement
-        layout = self.create_text_layout(cr, text if text else " ")
-
-        # Detect RTL exactly as draw()
-        rtl = detect_rtl_line(text)
-        text_w, _ = layout.get_pixel_size()
+        # Layout for RTL/LTR measurement (RTL detected exactly as draw())
+        layout, text_w, rtl = self.renderer.line_layout(cr, ln, text, self._hit_layout)
         view_w = self.get_width()
 
         base_x = self.renderer.calculate_text_base_x(rtl, text_w, view_w, ln_width, self.scroll_x)
@@ -5090,7 +5125,7 @@ class VirtualTextView(Gtk.DrawingArea):
                 return ln, len(text) + 1
         
         col_px = max(0, col_px)
-        col = self.pixel_to_column(cr, text, col_px)
+        col = self.pixel_to_column(cr, text, col_px, layout)
         col = max(0, min(col, len(text)))
 
         return ln, col
@@ -5105,45 +5140,57 @@ class VirtualTextView(Gtk.DrawingArea):
             # We moved! Activate drag-and-drop mode
             self.drag_and_drop_mode = True
             self._drag_pending = False
+            # The selection is what gets moved; a plain click never needs it
+            self.dragged_text = self.buf.get_selected_text()
             # Now we know it's a drag, so it's NOT a click-to-clear
             self._clicked_in_selection = False
             self.queue_draw()
 
+        if self.drag_and_drop_mode:
+            # Check if Ctrl is pressed for copy vs move visual feedback
+            self.ctrl_pressed_during_drag = (g.get_current_event_state() & _CTRL) != 0
+
+        # Pointer samples can outpace the display; only the latest one per
+        # main loop pass is hit-tested (see _apply_drag_motion)
+        self._drag_motion = (sx + dx, sy + dy)
+        if self._drag_motion_id is None:
+            self._drag_motion_id = GLib.idle_add(
+                self._apply_drag_motion, priority=GLib.PRIORITY_HIGH_IDLE + 10)
+
+    def _flush_drag_motion(self):
+        """Apply a pending drag sample now (before the drag ends)"""
+        if self._drag_motion_id is not None:
+            GLib.source_remove(self._drag_motion_id)
+            self._apply_drag_motion()
+
+    def _apply_drag_motion(self):
+        self._drag_motion_id = None
+        x, y = self._drag_motion
+
         # In drag-and-drop mode, track drop position for visual feedback
         if self.drag_and_drop_mode:
-            drop_ln, drop_col = self.xy_to_line_col(sx + dx, sy + dy)
+            drop_ln, drop_col = self.xy_to_line_col(x, y)
             self.drop_position_line = drop_ln
             self.drop_position_col = drop_col
-            
-            # Check if Ctrl is pressed for copy vs move visual feedback
-            event = g.get_current_event()
-            if event:
-                state = event.get_modifier_state()
-                self.ctrl_pressed_during_drag = (state & Gdk.ModifierType.CONTROL_MASK) != 0
-            
             self.queue_draw()
-            return
+            return False
 
-        ln, col = self.xy_to_line_col(sx + dx, sy + dy)
+        ln, col = self.xy_to_line_col(x, y)
         
         if self.word_selection_mode:
             # Word-by-word selection mode
             line_text = self.buf.get_line(ln)
             
-            # Get selection anchor point (start of initially selected word)
-            sel_start_line = self.buf.selection.start_line if self.buf.selection.active else ln
-            sel_start_col = self.buf.selection.start_col if self.buf.selection.active else col
-            
-            # Also track the end of original selection to determine drag direction
-            sel_end_line = self.buf.selection.end_line if self.buf.selection.active else ln
-            sel_end_col = self.buf.selection.end_col if self.buf.selection.active else col
+            # Track the end of original selection to determine drag direction
+            sel = self.buf.selection
+            sel_end_line, sel_end_col = (sel.end_line, sel.end_col) if sel.active else (ln, col)
             
             # Handle empty lines
             if len(line_text) == 0:
                 # Empty line - check if it's the last line (skip it)
                 if ln == self.buf.total() - 1:
                     # Last empty line: don't extend to it, stay at previous position
-                    return
+                    return False
                 else:
                     # Empty line not at EOF: treat entire line as one "word"
                     # Use start or end based on direction
@@ -5193,15 +5240,18 @@ class VirtualTextView(Gtk.DrawingArea):
             self.ctrl.update_drag(ln, col)
         
         self.queue_draw()
+        return False
 
 
     def on_click_released(self, g, n, x, y):
         if self._pending_click:
             self.ctrl.click(self._click_ln, self._click_col)
-        self._pending_click = False
-        self.queue_draw()
+            self._pending_click = False
+            self.queue_draw()
 
     def on_drag_end(self, g, dx, dy):
+        self._flush_drag_motion()
+
         # If we clicked in selection but didn't actually drag (drag_and_drop_mode wasn't set),
         # then we should clear the selection now
         if self._clicked_in_selection and not self.drag_and_drop_mode:
@@ -5217,12 +5267,8 @@ class VirtualTextView(Gtk.DrawingArea):
             if ok:
                 drop_ln, drop_col = self.xy_to_line_col(sx + dx, sy + dy)
                 
-                # Get current event to check for Ctrl key
-                event = g.get_current_event()
-                ctrl_pressed = False
-                if event:
-                    state = event.get_modifier_state()
-                    ctrl_pressed = (state & Gdk.ModifierType.CONTROL_MASK) != 0
+                # Check the current event for Ctrl (copy instead of move)
+                ctrl_pressed = (g.get_current_event_state() & _CTRL) != 0
                 
                 # Get original selection bounds
                 bounds = self.buf.selection.get_bounds()
@@ -5233,20 +5279,8 @@ class VirtualTextView(Gtk.DrawingArea):
                     self.queue_draw()
                     return
                 
-                start_line, start_col, end_line, end_col = bounds
-                
                 # Check if dropping inside the original selection (no-op)
-                drop_in_selection = False
-                if start_line == end_line:
-                    if drop_ln == start_line and start_col <= drop_col <= end_col:
-                        drop_in_selection = True
-                else:
-                    if drop_ln == start_line and drop_col >= start_col:
-                        drop_in_selection = True
-                    elif drop_ln == end_line and drop_col <= end_col:
-                        drop_in_selection = True
-                    elif start_line < drop_ln < end_line:
-                        drop_in_selection = True
+                drop_in_selection = self.buf.selection.contains_position(drop_ln, drop_col)
                 
                 if not drop_in_selection and self.dragged_text:
                     if ctrl_pressed:
@@ -5255,56 +5289,22 @@ class VirtualTextView(Gtk.DrawingArea):
                         self.buf.insert_text(self.dragged_text)
                     else:
                         # Move: delete original, insert at drop position
-                        # Delete first
-                        self.buf.delete_selection()
-                        # Recalculate drop position if it's after the deleted text
-                        if drop_ln > end_line or (drop_ln == end_line and drop_col > end_col):
-                            # Adjust for deleted text
-                            if start_line == end_line:
-                                # Single line deletion
-                                chars_deleted = end_col - start_col
-                                if drop_ln == start_line:
-                                    drop_col -= chars_deleted
-                            else:
-                                # Multi-line deletion
-                                lines_deleted = end_line - start_line
-                                if drop_ln > end_line:
-                                    drop_ln -= lines_deleted
-                        
-                        # Insert at adjusted position
-                        self.buf.set_cursor(drop_ln, drop_col)
-                        self.buf.insert_text(self.dragged_text)
+                        self.buf.move_selection_to(drop_ln, drop_col, self.dragged_text)
                 
                 self.keep_cursor_visible()
             
-            # Exit drag-and-drop mode
+            # Exit drag-and-drop mode (removes the drop preview)
             self.drag_and_drop_mode = False
             self.dragged_text = ""
+            self.queue_draw()
         else:
             # Normal drag end
             self.ctrl.end_drag()
             
             # Copy selection to PRIMARY clipboard for middle-click paste
             if self.buf.selection.has_selection():
-                start_ln, start_col, end_ln, end_col = self.buf.selection.get_bounds()
-                
                 # Extract selected text
-                if start_ln == end_ln:
-                    # Single line selection
-                    line = self.buf.get_line(start_ln)
-                    selected_text = line[start_col:end_col]
-                else:
-                    # Multi-line selection
-                    lines = []
-                    for ln in range(start_ln, end_ln + 1):
-                        line = self.buf.get_line(ln)
-                        if ln == start_ln:
-                            lines.append(line[start_col:])
-                        elif ln == end_ln:
-                            lines.append(line[:end_col])
-                        else:
-                            lines.append(line)
-                    selected_text = '\n'.join(lines)
+                selected_text = self.buf.get_selected_text()
                 
                 # Copy to PRIMARY clipboard
                 if selected_text:
@@ -5312,10 +5312,9 @@ class VirtualTextView(Gtk.DrawingArea):
                     clipboard = display.get_primary_clipboard()
                     clipboard.set(selected_text)
         
-        # Clear word selection mode
+        # Clear word selection mode; a plain drag end leaves the view as the
+        # last drag update drew it, so it needs no redraw
         self.word_selection_mode = False
-        
-        self.queue_draw()
 
 
     def keep_cursor_visible(self):
@@ -5345,21 +5344,15 @@ class VirtualTextView(Gtk.DrawingArea):
         # ----- compute cursor X inside renderer -----
         line_text = self.buf.get_line(cl)
 
-        # Build Pango layout to get exact pixel position
-        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
-        cr = cairo.Context(surface)
-        layout = self.create_text_layout(cr, line_text if line_text else " ")
-
-        # RTL detection (mirrors renderer.draw)
-        rtl = detect_rtl_line(line_text)
+        # Pango layout to get exact pixel position (RTL detected as in draw)
+        cr = self._im_cr
+        layout, text_w, rtl = self.renderer.line_layout(cr, cl, line_text, self._im_layout)
         byte_index = self.visual_byte_index(line_text, cc)
-        strong_pos, weak_pos = layout.get_cursor_pos(byte_index)
-        cursor_px = strong_pos.x // Pango.SCALE
+        cursor_px = self.renderer.cursor_x(layout, line_text, byte_index) // Pango.SCALE
         ln_w = self.renderer.calculate_line_number_width(cr, self.buf.total())
         alloc_w = self.get_width()
 
         # Calculate base X exactly as renderer.draw does
-        text_w, _ = layout.get_pixel_size()
         base_x = self.renderer.calculate_text_base_x(rtl, text_w, alloc_w, ln_w, self.scroll_x)
 
         cursor_screen_x = base_x + cursor_px
@@ -5395,12 +5388,11 @@ class VirtualTextView(Gtk.DrawingArea):
         self.add_controller(sc)
 
     def on_scroll(self, c, dx, dy):
-        total = self.buf.total()
-        max_vis = max(1, self.get_height() // self.renderer.line_h)
-        max_scroll = max(0, total - max_vis)
-
-
         if dy:
+            # Only vertical scrolling needs the line bounds
+            total = self.buf.total()
+            max_vis = max(1, self.get_height() // self.renderer.line_h)
+            max_scroll = max(0, total - max_vis)
             self.scroll_line = max(
                 0,
                 min(self.scroll_line + int(dy * 4), max_scroll)
@@ -5409,19 +5401,18 @@ class VirtualTextView(Gtk.DrawingArea):
         if dx:
             self.scroll_x = max(0, self.scroll_x + int(dx * 40))
 
-        self.update_scrollbar()
-
-
+        # Touchpads deliver several events per frame; GTK already merges
+        # the redraws, so only the scrollbar update is deferred here
+        self.queue_scrollbar_update()
         self.queue_draw()
         return True
 
 
     def draw_view(self, area, cr, w, h):
-        cr.set_source_rgb(0.10, 0.10, 0.10)
-        cr.rectangle(0, 0, w, h)
-        cr.fill()
-
-        alloc = type("Alloc", (), {"width": w, "height": h})
+        # Renderer.draw paints the background itself
+        alloc = self._alloc
+        alloc.width = w
+        alloc.height = h
 
         # Hide cursor if there's an active selection
         show_cursor = self.cursor_visible and not self.buf.selection.has_selection()
@@ -6115,11 +6106,11 @@ class EditorWindow(Adw.ApplicationWindow):
 
     def on_window_key_pressed(self, controller, keyval, keycode, state):
         # Ctrl+Tab / Ctrl+Shift+Tab / Ctrl+T / Ctrl+O / Ctrl+Shift+S
-        if state & Gdk.ModifierType.CONTROL_MASK:
+        if state & _CTRL:
             # Tab switching
             if keyval == Gdk.KEY_Tab or keyval == Gdk.KEY_ISO_Left_Tab:
                 direction = 1
-                if (state & Gdk.ModifierType.SHIFT_MASK) or keyval == Gdk.KEY_ISO_Left_Tab:
+                if (state & _SHIFT) or keyval == Gdk.KEY_ISO_Left_Tab:
                     direction = -1
                 
                 n_pages = self.tab_view.get_n_pages()
@@ -6143,7 +6134,7 @@ class EditorWindow(Adw.ApplicationWindow):
                 return True
                 
             # Ctrl+Shift+S: Save As
-            elif (keyval == Gdk.KEY_s or keyval == Gdk.KEY_S) and (state & Gdk.ModifierType.SHIFT_MASK):
+            elif (keyval == Gdk.KEY_s or keyval == Gdk.KEY_S) and (state & _SHIFT):
                 self.on_save_as(None, None)
                 return True
             